@@ -2,585 +2,4244 @@ import os
 import time
 import csv
 import re
-from io import StringIO, BytesIO
-from flask import Flask, render_template, jsonify, send_file
-from flask_socketio import SocketIO, emit
+import json
+import hashlib
+import threading
+import uuid
+import zlib
+import sqlite3
+import base64
+import calendar
+import datetime
+import functools
+import gzip
+import multiprocessing
+import random
+import sys
+import mmap
+import mimetypes
+import struct
+import textwrap
+import email.utils
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from operator import attrgetter
+from html import unescape
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from flask import (
+    Flask, Response, render_template, jsonify, request, stream_with_context, url_for
+)
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from socketio import PubSubManager
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml è opzionale: senza, si usa solo BeautifulSoup
+    etree = None
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "secret!"
-socketio = SocketIO(app, cors_allowed_origins="*")
+# `socketio` viene creato più avanti, dopo SqliteQueueManager
 
 BASE_URL = "https://www.salto-youth.net"
 SEARCH_URL = BASE_URL + "/tools/european-training-calendar/browse/"
 
-# Variabile globale per memorizzare i risultati
-scraped_data = []
-
 # Cartella per salvare il CSV
 OUTPUT_DIR = "output"
+CSV_PATH = os.path.join(OUTPUT_DIR, "salto_events_complete.csv")
 
+# Archivio SQLite dei risultati, condiviso da tutti i worker
+DB_PATH = os.environ.get("SCRAPER_DB_PATH", os.path.join(OUTPUT_DIR, "salto_events.db"))
+STORE_BATCH_SIZE = int(os.environ.get("SCRAPER_STORE_BATCH_SIZE", "100"))
 
-def parse_list_page(html):
+# Differenze tra run consecutivi: file delta in output/changes/<run_id>.json
+# e storico in SQLite per /api/changes, limitato agli ultimi CHANGES_KEEP_RUNS
+CHANGES_DIR = os.path.join(OUTPUT_DIR, "changes")
+CHANGES_KEEP_RUNS = int(os.environ.get("SCRAPER_CHANGES_KEEP_RUNS", "100"))
+
+# Più worker (vedi Procfile): gli eventi Socket.IO passano da una coda
+# condivisa. "" = nessuna coda (un solo processo), "sqlite" = coda locale su
+# SOCKETIO_QUEUE_DB, altrimenti l'URL di un message queue supportato da
+# Flask-SocketIO (redis://, amqp://, ...)
+SOCKETIO_QUEUE = os.environ.get("SCRAPER_SOCKETIO_QUEUE", "")
+SOCKETIO_QUEUE_DB = os.path.join(OUTPUT_DIR, "socketio_queue.db")
+# Modalità async di Socket.IO: threading, eventlet, gevent (vuoto = automatica)
+ASYNC_MODE = os.environ.get("SCRAPER_ASYNC_MODE") or None
+# Un solo scraping alla volta tra tutti i worker: lock nell'archivio SQLite,
+# rinnovato mentre il job è in corso e scaduto dopo SCRAPE_LOCK_TTL secondi
+# se il worker muore
+SCRAPE_LOCK_TTL = float(os.environ.get("SCRAPER_LOCK_TTL", "60"))
+
+# Righe di un run in corso, aggiunte man mano che sono complete (il CSV
+# definitivo si riscrive alla fine); scritte almeno ogni
+# PARTIAL_FLUSH_INTERVAL secondi
+PARTIAL_CSV_PATH = os.path.join(OUTPUT_DIR, "salto_events_partial.csv")
+PARTIAL_FLUSH_INTERVAL = float(os.environ.get("SCRAPER_PARTIAL_FLUSH_INTERVAL", "2"))
+
+# Riepiloghi JSON dei run (tempi per fase, richieste, byte)
+RUNS_DIR = os.path.join(OUTPUT_DIR, "runs")
+LAST_RUN_PATH = os.path.join(OUTPUT_DIR, "last_run.json")
+
+# Snapshot versionati dei risultati (un CSV gzip per run), per ritrovare i
+# dati dopo un riavvio o un nuovo deploy: SNAPSHOT_DIR può stare su un disco
+# persistente. Conservazione: gli ultimi SNAPSHOT_KEEP, eliminando quelli più
+# vecchi di SNAPSHOT_MAX_AGE_DAYS giorni (0 = nessun limite); l'ultimo resta
+SNAPSHOT_DIR = os.environ.get("SCRAPER_SNAPSHOT_DIR", os.path.join(OUTPUT_DIR, "snapshots"))
+SNAPSHOT_KEEP = int(os.environ.get("SCRAPER_SNAPSHOT_KEEP", "14"))
+SNAPSHOT_MAX_AGE_DAYS = float(os.environ.get("SCRAPER_SNAPSHOT_MAX_AGE_DAYS", "30"))
+
+# Scraping pianificato: intervallo ("30m", "6h", "1d" o secondi) oppure
+# espressione cron a 5 campi in UTC ("0 */6 * * *"); vuoto = disattivato.
+# I run pianificati sono incrementali, salvo SCRAPER_SCHEDULE_INCREMENTAL=0
+SCHEDULE = os.environ.get("SCRAPER_SCHEDULE", "").strip()
+SCHEDULE_INCREMENTAL = os.environ.get("SCRAPER_SCHEDULE_INCREMENTAL", "1") != "0"
+
+# Limite di sicurezza sulle pagine lista (il numero reale viene dal pager)
+MAX_LIST_PAGES = int(os.environ.get("SCRAPER_MAX_LIST_PAGES", "50"))
+
+# Colonne del CSV esportato, nell'ordine
+CSV_FIELDNAMES = [
+    "title",
+    "type",
+    "dates",
+    "location",
+    "application_deadline",
+    "participants_no",
+    "participants_from",
+    "recommended_for",
+    "accessibility",
+    "working_language",
+    "organiser",
+    "participation_fee",
+    "accommodation_food",
+    "travel_reimbursement",
+    "infopack_downloads",
+    "infopack_urls",
+    "infopack_files",
+    "application_procedure_url",
+    "application_form_link",
+    "detail_url",
+    "deadline",
+    "start_date",
+    "end_date",
+    "sort_key",
+    "fetch_error",
+    "detail_digest",
+]
+
+# Modalità incrementale: campi della pagina lista che, se cambiano,
+# richiedono di riscaricare il dettaglio; gli altri campi vengono riusati
+LIST_CHANGE_FIELDS = ("dates", "application_deadline", "location")
+DETAIL_FIELDS = (
+    "participants_no",
+    "participants_from",
+    "recommended_for",
+    "accessibility",
+    "working_language",
+    "organiser",
+    "participation_fee",
+    "accommodation_food",
+    "travel_reimbursement",
+    "infopack_downloads",
+    "infopack_urls",
+    "application_procedure_url",
+    "application_form_link",
+    # Impronta della pagina di dettaglio da cui vengono i campi sopra
+    "detail_digest",
+)
+
+# Concorrenza del fetch: thread totali, richieste simultanee per host e
+# rate limit (richieste/secondo, con burst) al posto dei vecchi time.sleep(1)
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", "8"))
+MAX_PER_HOST = int(os.environ.get("SCRAPER_MAX_PER_HOST", "4"))
+RATE_LIMIT = float(os.environ.get("SCRAPER_RATE_LIMIT", "4"))
+RATE_BURST = int(os.environ.get("SCRAPER_RATE_BURST", "4"))
+
+# Dettagli in volo al massimo nello stadio dei dettagli (memoria limitata)
+DETAIL_WINDOW = MAX_WORKERS * 4
+
+# Retry delle richieste fallite (errori di rete, 429, 5xx) con backoff
+# esponenziale e jitter; Retry-After del server ha la precedenza
+MAX_RETRIES = int(os.environ.get("SCRAPER_MAX_RETRIES", "3"))
+RETRY_BACKOFF = float(os.environ.get("SCRAPER_RETRY_BACKOFF", "1"))
+RETRY_BACKOFF_MAX = float(os.environ.get("SCRAPER_RETRY_BACKOFF_MAX", "60"))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Circuit breaker per host: se nelle ultime BREAKER_WINDOW richieste la quota
+# di errori supera BREAKER_THRESHOLD, le richieste verso quell'host si
+# fermano per BREAKER_COOLDOWN secondi
+BREAKER_WINDOW = int(os.environ.get("SCRAPER_BREAKER_WINDOW", "20"))
+BREAKER_THRESHOLD = float(os.environ.get("SCRAPER_BREAKER_THRESHOLD", "0.5"))
+BREAKER_COOLDOWN = float(os.environ.get("SCRAPER_BREAKER_COOLDOWN", "30"))
+
+# Avanzamento dei job su Socket.IO: messaggi "progress" accorpati e inviati
+# al massimo ogni PROGRESS_INTERVAL secondi alla stanza del job
+PROGRESS_INTERVAL = float(os.environ.get("SCRAPER_PROGRESS_INTERVAL", "1"))
+PROGRESS_MAX_LOGS = 100
+
+# Backend dei parser HTML: "bs4" (default) usa BeautifulSoup con
+# html.parser; "lxml" (o "auto") usa lxml se installato. libxml2 corregge
+# l'HTML malformato in modo diverso da html.parser e i golden contengono
+# ancora poche pagine di dettaglio: lxml resta facoltativo finché il corpus
+# non ha pagine SALTO reali
+PARSER_BACKEND = os.environ.get("SCRAPER_PARSER", "bs4")
+
+# Processi per il parsing HTML (lavoro CPU, fuori dal processo web e dal
+# suo GIL); 0 = parsing nel processo, nei thread del fetch
+PARSE_WORKERS = int(
+    os.environ.get("SCRAPER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Versione dei campi estratti dalle pagine di dettaglio: va aumentata quando
+# i parser cambiano, così le impronte salvate (detail_digest) non valgono più
+# e le pagine vengono rianalizzate
+DETAIL_PARSER_VERSION = 2
+
+# Versione dei parser delle pagine lista e application procedure: va aumentata
+# quando cambiano i campi estratti. I risultati salvati nella cache HTTP
+# ("parsed") valgono solo con le stesse versioni, altrimenti alla prossima 304
+# la pagina viene rianalizzata
+PARSER_VERSION = 2
+PARSED_CACHE_VERSION = f"{PARSER_VERSION}.{DETAIL_PARSER_VERSION}"
+
+# Copia locale degli infopack (facoltativa): tutti i file di "Available
+# downloads" scaricati in INFOPACK_DIR, INFOPACK_WORKERS alla volta; i file
+# oltre INFOPACK_MAX_BYTES vengono scartati
+INFOPACK_MIRROR = os.environ.get("SCRAPER_INFOPACK_MIRROR", "0") != "0"
+INFOPACK_DIR = os.environ.get("SCRAPER_INFOPACK_DIR", os.path.join(OUTPUT_DIR, "infopacks"))
+INFOPACK_WORKERS = int(os.environ.get("SCRAPER_INFOPACK_WORKERS", "4"))
+INFOPACK_MAX_BYTES = int(
+    os.environ.get("SCRAPER_INFOPACK_MAX_BYTES", str(50 * 1024 * 1024))
+)
+INFOPACK_CHUNK_SIZE = 64 * 1024
+
+# Memo persistente procedure URL -> link del form esterno (secondi)
+APPLICATION_LINK_TTL = int(os.environ.get("SCRAPER_APP_LINK_TTL", str(7 * 24 * 3600)))
+
+# Cache HTTP su disco (GET condizionali con ETag/Last-Modified)
+HTTP_CACHE_ENABLED = os.environ.get("SCRAPER_HTTP_CACHE", "1") != "0"
+HTTP_CACHE_DIR = os.path.join(OUTPUT_DIR, "http_cache")
+HTTP_CACHE_MAX_BYTES = int(
+    os.environ.get("SCRAPER_HTTP_CACHE_MAX_BYTES", str(200 * 1024 * 1024))
+)
+HTTP_CACHE_TTL = int(os.environ.get("SCRAPER_HTTP_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Trasporto HTTP: "live" (rete), "record" (rete + registra ogni risposta in
+# HTTP_ARCHIVE_PATH) o "replay" (solo dall'archivio, niente rete né rate limit)
+HTTP_MODE = os.environ.get("SCRAPER_HTTP_MODE", "live")
+HTTP_ARCHIVE_PATH = os.environ.get(
+    "SCRAPER_HTTP_ARCHIVE", os.path.join(OUTPUT_DIR, "http_archive.bin")
+)
+
+
+class TokenBucket:
     """
-    Estrae gli eventi dalla pagina di lista SALTO (European Training Calendar).
-    Prova due metodi:
-    1. Cerca <h3> con link (metodo vecchio script)
-    2. Cerca tutti i link che puntano a /tools/european-training-calendar/training/
+    Rate limiter a token bucket, thread-safe.
+    Ogni richiesta consuma un token; i token si ricaricano a `rate` al secondo
+    fino a un massimo di `capacity` (il burst consentito).
     """
-    soup = BeautifulSoup(html, "html.parser")
-    events = []
-    seen_urls = set()
 
-    # METODO 1: cerca <h3> con link
-    for h3 in soup.find_all("h3"):
-        a = h3.find("a")
-        if not a:
-            continue
-        title = a.get_text(strip=True)
-        url = a.get("href", "").strip()
-        if url and not url.startswith("http"):
-            url = BASE_URL + url
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
-        if url in seen_urls:
-            continue
-        seen_urls.add(url)
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-        block = h3.parent
-        text = block.get_text("\n", strip=True)
-        lines = [l for l in text.split("\n") if l.strip()]
 
+class HostThrottle:
+    """
+    Limita le richieste verso ciascun host: al massimo `max_per_host`
+    richieste in volo e un TokenBucket dedicato per il rate limit.
+    """
+
+    def __init__(self, max_per_host, rate, burst):
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (
+                    threading.BoundedSemaphore(self.max_per_host),
+                    TokenBucket(self.rate, self.burst),
+                )
+            return self.hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        semaphore, bucket = self._host(url)
+        with semaphore:
+            bucket.acquire()
+            yield
+
+
+# In replay non c'è un sito da proteggere: si va alla massima velocità
+throttle = HostThrottle(MAX_PER_HOST, 0 if HTTP_MODE == "replay" else RATE_LIMIT, RATE_BURST)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per host. Tiene l'esito delle ultime `window` richieste;
+    quando la quota di errori (rete, 429, 5xx) raggiunge `threshold` il
+    circuito si apre e `wait()` sospende chi vuole contattare l'host per
+    `cooldown` secondi. Poi il circuito si richiude con la finestra azzerata.
+    """
+
+    def __init__(self, window, threshold, cooldown):
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _state(self, host):
+        # stato per host: [esiti recenti (True = errore), riapertura]
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = [deque(maxlen=self.window), 0.0]
+        return state
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        while True:
+            with self.lock:
+                delay = self._state(host)[1] - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def record(self, url, failed):
+        host = urlsplit(url).netloc
+        with self.lock:
+            state = self._state(host)
+            outcomes = state[0]
+            outcomes.append(failed)
+            if (
+                len(outcomes) < self.window
+                or sum(outcomes) < self.threshold * self.window
+            ):
+                return
+            outcomes.clear()
+            state[1] = time.monotonic() + self.cooldown
+        msg = f"Troppi errori da {host}: pausa di {self.cooldown:.0f}s"
+        print(f"DEBUG: {msg}")
+        report(msg)
+
+
+class ScrapeMetrics:
+    """
+    Tempi e contatori della pipeline di scraping.
+    - tempo cumulato e numero di chiamate per fase (somma su tutti i thread)
+    - richieste HTTP per status code, byte ricevuti, retry
+    I totali valgono dall'avvio del processo (esposti su /metrics); i valori
+    del run in corso finiscono nel riepilogo JSON del run.
+    """
+
+    PHASES = (
+        "list_fetch",
+        "list_parse",
+        "detail_fetch",
+        "detail_parse",
+        "external_link",
+        "store_write",
+        "csv_write",
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = self._empty()
+        self.runs = {}  # esito -> numero di run
+        self.run = None
+        self.run_id = None
+        self.run_started = None
+        self.last_summary = None
+
+    def _empty(self):
+        return {
+            "phase_seconds": dict.fromkeys(self.PHASES, 0.0),
+            "phase_calls": dict.fromkeys(self.PHASES, 0),
+            "requests": {},
+            "bytes": 0,
+            "retries": 0,
+            "parse_skipped": 0,
+        }
+
+    def _targets(self):
+        return (self.totals, self.run) if self.run is not None else (self.totals,)
+
+    @contextmanager
+    def timed(self, phase):
+        start = time.perf_counter()
         try:
-            idx = lines.index(title)
-        except ValueError:
-            idx = 0
-
-        type_ = ""
-        dates = ""
-        location = ""
-        app_deadline = ""
-
-        if idx > 0:
-            type_ = lines[idx - 1]
-        if idx + 1 < len(lines):
-            dates = lines[idx + 1]
-        if idx + 2 < len(lines):
-            location = lines[idx + 2]
-
-        for l in lines:
-            if "Application deadline" in l:
-                app_deadline = l.split(":", 1)[-1].strip()
-                break
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                for target in self._targets():
+                    target["phase_seconds"][phase] += elapsed
+                    target["phase_calls"][phase] += 1
 
-        events.append(
-            {
-                "title": title,
-                "type": type_,
-                "dates": dates,
-                "location": location,
-                "application_deadline": app_deadline,
-                "detail_url": url,
+    def record_response(self, status, nbytes):
+        status = str(status)
+        with self.lock:
+            for target in self._targets():
+                target["requests"][status] = target["requests"].get(status, 0) + 1
+                target["bytes"] += nbytes
+
+    def record_retry(self):
+        with self.lock:
+            for target in self._targets():
+                target["retries"] += 1
+
+    def record_parse_skip(self):
+        with self.lock:
+            for target in self._targets():
+                target["parse_skipped"] += 1
+
+    def current(self, counter):
+        """Valore di un contatore nel run in corso (0 se nessun run è in corso)."""
+        with self.lock:
+            return self.run[counter] if self.run is not None else 0
+
+    def start_run(self, run_id):
+        with self.lock:
+            self.run = self._empty()
+            self.run_id = run_id
+            self.run_started = time.time()
+
+    def finish_run(self, status, events=None, **extra):
+        """Chiude il run e restituisce il riepilogo (dict serializzabile in JSON)."""
+        with self.lock:
+            run = self.run or self._empty()
+            finished = time.time()
+            summary = {
+                "run_id": self.run_id,
+                "status": status,
+                "started_at": self.run_started,
+                "finished_at": finished,
+                "duration_seconds": round(finished - (self.run_started or finished), 3),
+                "events": events,
+                "phases": {
+                    phase: {
+                        "seconds": round(run["phase_seconds"][phase], 3),
+                        "calls": run["phase_calls"][phase],
+                    }
+                    for phase in self.PHASES
+                },
+                "requests": dict(run["requests"]),
+                "requests_total": sum(run["requests"].values()),
+                "bytes": run["bytes"],
+                "retries": run["retries"],
+                "parse_skipped": run["parse_skipped"],
             }
-        )
+            summary.update(extra)
+            self.runs[status] = self.runs.get(status, 0) + 1
+            self.run = None
+            self.last_summary = summary
+            return summary
 
-    # METODO 2: se non ha trovato nulla con <h3>, cerca tutti i link diretti
-    if not events:
-        for link in soup.select(
-                "a[href*='/tools/european-training-calendar/training/']"
-        ):
-            title = link.get_text(strip=True)
-            if not title:
-                continue
+    def prometheus(self):
+        """Metriche nel formato testo di Prometheus."""
+        with self.lock:
+            totals = self.totals
+            lines = [
+                "# HELP salto_phase_seconds_total Tempo cumulato per fase della pipeline.",
+                "# TYPE salto_phase_seconds_total counter",
+            ]
+            for phase in self.PHASES:
+                lines.append(
+                    f'salto_phase_seconds_total{{phase="{phase}"}} '
+                    f'{totals["phase_seconds"][phase]:.6f}'
+                )
+            lines += [
+                "# HELP salto_phase_calls_total Numero di esecuzioni per fase.",
+                "# TYPE salto_phase_calls_total counter",
+            ]
+            for phase in self.PHASES:
+                lines.append(
+                    f'salto_phase_calls_total{{phase="{phase}"}} {totals["phase_calls"][phase]}'
+                )
+            lines += [
+                "# HELP salto_http_requests_total Richieste HTTP per status code.",
+                "# TYPE salto_http_requests_total counter",
+            ]
+            for status, count in sorted(totals["requests"].items()):
+                lines.append(f'salto_http_requests_total{{status="{status}"}} {count}')
+            lines += [
+                "# HELP salto_http_response_bytes_total Byte ricevuti.",
+                "# TYPE salto_http_response_bytes_total counter",
+                f"salto_http_response_bytes_total {totals['bytes']}",
+                "# HELP salto_http_retries_total Richieste ripetute.",
+                "# TYPE salto_http_retries_total counter",
+                f"salto_http_retries_total {totals['retries']}",
+                "# HELP salto_detail_parse_skipped_total Pagine di dettaglio non rianalizzate (contenuto invariato).",
+                "# TYPE salto_detail_parse_skipped_total counter",
+                f"salto_detail_parse_skipped_total {totals['parse_skipped']}",
+                "# HELP salto_runs_total Run di scraping per esito.",
+                "# TYPE salto_runs_total counter",
+            ]
+            for status, count in sorted(self.runs.items()):
+                lines.append(f'salto_runs_total{{status="{status}"}} {count}')
+            lines += [
+                "# HELP salto_scrape_running 1 se uno scraping è in corso.",
+                "# TYPE salto_scrape_running gauge",
+                f"salto_scrape_running {1 if self.run is not None else 0}",
+            ]
+            if self.last_summary:
+                lines += [
+                    "# HELP salto_last_run_duration_seconds Durata dell'ultimo run.",
+                    "# TYPE salto_last_run_duration_seconds gauge",
+                    f"salto_last_run_duration_seconds {self.last_summary['duration_seconds']}",
+                    "# HELP salto_last_run_finished_timestamp_seconds Fine dell'ultimo run.",
+                    "# TYPE salto_last_run_finished_timestamp_seconds gauge",
+                    f"salto_last_run_finished_timestamp_seconds {self.last_summary['finished_at']:.3f}",
+                ]
+        return "\n".join(lines) + "\n"
 
-            detail_url = link.get("href", "").strip()
-            if detail_url and not detail_url.startswith("http"):
-                detail_url = BASE_URL + detail_url
 
-            if detail_url in seen_urls:
+metrics = ScrapeMetrics()
+breaker = CircuitBreaker(BREAKER_WINDOW, BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+
+def throttled_get(session, url, **kwargs):
+    """
+    GET rispettando il limite di concorrenza per host, il rate limit e il
+    circuit breaker dell'host. Errori di rete e status in RETRY_STATUSES
+    vengono ripetuti fino a MAX_RETRIES volte (vedi `retry_delay`); finiti i
+    tentativi si restituisce l'ultima risposta o si rilancia l'eccezione.
+    `session` può essere una requests.Session o il modulo requests stesso.
+    """
+    attempt = 0
+    while True:
+        breaker.wait(url)
+        resp = None
+        with throttle.slot(url):
+            try:
+                resp = session.get(url, **kwargs)
+            except requests.RequestException:
+                metrics.record_response("error", 0)
+                if attempt >= MAX_RETRIES:
+                    breaker.record(url, True)
+                    raise
+        if resp is not None:
+            if getattr(resp, "not_modified", False):
+                metrics.record_response(304, 0)
+            elif kwargs.get("stream"):
+                # Corpo non ancora letto: conta la lunghezza dichiarata
+                metrics.record_response(
+                    resp.status_code, int(resp.headers.get("Content-Length") or 0)
+                )
+            else:
+                metrics.record_response(resp.status_code, len(resp.content))
+            failed = resp.status_code in RETRY_STATUSES
+            breaker.record(url, failed)
+            if not failed or attempt >= MAX_RETRIES:
+                return resp
+        else:
+            breaker.record(url, True)
+
+        if resp is not None:
+            resp.close()
+        attempt += 1
+        delay = retry_delay(attempt, resp)
+        metrics.record_retry()
+        print(f"DEBUG: nuovo tentativo {attempt}/{MAX_RETRIES} per {url} tra {delay:.1f}s")
+        time.sleep(delay)
+
+
+def retry_delay(attempt, resp=None):
+    """
+    Attesa prima del tentativo `attempt` (da 1): il Retry-After della
+    risposta se presente (secondi o data HTTP), altrimenti backoff
+    esponenziale con jitter pieno, limitato a RETRY_BACKOFF_MAX.
+    """
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                when = None
+            seconds = when.timestamp() - time.time() if when else None
+        if seconds is not None:
+            return min(max(seconds, 0.0), RETRY_BACKOFF_MAX)
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
+class HttpCache:
+    """
+    Cache HTTP su disco. Per ogni URL salva due file (nome = sha1 dell'URL):
+    - <key>.body: il corpo della risposta
+    - <key>.json: URL, ETag, Last-Modified, encoding, timestamp e l'eventuale
+      risultato già estratto dalla pagina ("parsed", con la versione dei
+      parser che l'ha prodotto in "parsed_version")
+    Le voci più vecchie di `ttl` secondi vengono ignorate; oltre `max_bytes`
+    si eliminano le voci usate meno di recente (LRU).
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index = None  # key -> dimensione in byte, in ordine LRU
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def reload(self):
+        """Rilegge l'indice dal disco al prossimo accesso."""
+        with self.lock:
+            self.index = None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.index or {}),
+            "bytes": self.total_bytes,
+        }
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
                 continue
-            seen_urls.add(detail_url)
+            key = name[:-5]
+            try:
+                with open(self._path(key, "json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+                size = meta["size"]
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((meta.get("accessed_at", 0), key, size))
+        self.index = OrderedDict()
+        self.total_bytes = 0
+        for _, key, size in sorted(entries):
+            self.index[key] = size
+            self.total_bytes += size
 
-            # Contenitore principale del blocco evento
-            container = link.find_parent()
-            for _ in range(4):
-                if container and container.name not in ["body", "html"]:
-                    container = container.parent
+    def _remove(self, key):
+        self.total_bytes -= self.index.pop(key, 0)
+        for ext in ("json", "body"):
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
 
-            text_block = container.get_text("\n", strip=True) if container else ""
-            lines = [l.strip() for l in text_block.split("\n") if l.strip()]
+    def _write_meta(self, key, meta):
+        tmp = self._path(key, "json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, "json"))
 
+    def lookup(self, url):
+        """Restituisce (meta, body) della voce in cache, oppure None."""
+        with self.lock:
+            self._load_index()
+            key = self._key(url)
+            if key not in self.index:
+                return None
             try:
-                idx = lines.index(title)
-            except ValueError:
-                idx = 0
-
-            type_ = ""
-            dates = ""
-            location = ""
-            app_deadline = ""
-
-            if idx - 1 >= 0:
-                type_ = lines[idx - 1]
-            if idx + 1 < len(lines):
-                dates = lines[idx + 1]
-            if idx + 2 < len(lines):
-                location = lines[idx + 2]
-
-            for i, line in enumerate(lines):
-                if "Application deadline" in line:
-                    if i + 1 < len(lines):
-                        app_deadline = lines[i + 1]
-                    break
+                with open(self._path(key, "json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+                with open(self._path(key, "body"), "rb") as f:
+                    body = f.read()
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            if meta.get("url") != url or time.time() - meta["stored_at"] > self.ttl:
+                self._remove(key)
+                return None
+            return meta, body
 
-            events.append(
-                {
-                    "title": title,
-                    "type": type_,
-                    "dates": dates,
-                    "location": location,
-                    "application_deadline": app_deadline,
-                    "detail_url": detail_url,
-                }
+    def store(self, url, resp):
+        """Salva una risposta 200 (solo se ha ETag o Last-Modified)."""
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        body = resp.content
+        now = time.time()
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": resp.encoding,
+            "content_type": resp.headers.get("Content-Type", ""),
+            "stored_at": now,
+            "accessed_at": now,
+            "parsed": None,
+            "size": len(body),
+        }
+        with self.lock:
+            self._load_index()
+            key = self._key(url)
+            self._remove(key)
+            tmp = self._path(key, "body.tmp")
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(key, "body"))
+            self._write_meta(key, meta)
+            self.index[key] = len(body)
+            self.total_bytes += len(body)
+            # Eviction LRU oltre la dimensione massima
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                oldest = next(iter(self.index))
+                self._remove(oldest)
+
+    def _update_meta(self, url, **changes):
+        with self.lock:
+            self._load_index()
+            key = self._key(url)
+            if key not in self.index:
+                return
+            try:
+                with open(self._path(key, "json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return
+            meta.update(changes)
+            self._write_meta(key, meta)
+            self.index.move_to_end(key)
+
+    def touch(self, url):
+        """Rinnova una voce rivalidata dal server (risposta 304)."""
+        now = time.time()
+        self._update_meta(url, stored_at=now, accessed_at=now)
+
+    def set_parsed(self, url, parsed):
+        """Memorizza il risultato del parsing, riusato alla prossima 304."""
+        self._update_meta(url, parsed=parsed, parsed_version=PARSED_CACHE_VERSION)
+
+
+class CachedSession:
+    """
+    Avvolge una requests.Session (o il modulo requests) aggiungendo i GET
+    condizionali: invia If-None-Match / If-Modified-Since e, su 304, restituisce
+    il corpo salvato in cache. Le risposte hanno due attributi in più:
+    - not_modified: True se il corpo arriva dalla cache
+    - parsed: il risultato del parsing salvato con HttpCache.set_parsed, None
+      se manca o se l'hanno prodotto parser di un'altra versione
+    """
+
+    def __init__(self, session, cache):
+        self.session = session
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, **kwargs):
+        if not HTTP_CACHE_ENABLED:
+            resp = self.session.get(url, **kwargs)
+            resp.not_modified = False
+            resp.parsed = None
+            return resp
+
+        cached = self.cache.lookup(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = self.session.get(url, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and cached:
+            meta, body = cached
+            self.cache.touch(url)
+            with self.cache.lock:
+                self.cache.hits += 1
+            cached_resp = requests.Response()
+            cached_resp.status_code = 200
+            cached_resp.url = url
+            cached_resp._content = body
+            cached_resp.encoding = meta.get("encoding")
+            cached_resp.headers["Content-Type"] = meta.get("content_type", "")
+            cached_resp.request = resp.request
+            cached_resp.not_modified = True
+            cached_resp.parsed = (
+                meta.get("parsed")
+                if meta.get("parsed_version") == PARSED_CACHE_VERSION else None
             )
+            return cached_resp
 
-    return events
+        with self.cache.lock:
+            self.cache.misses += 1
+        if resp.status_code == 200:
+            self.cache.store(url, resp)
+        resp.not_modified = False
+        resp.parsed = None
+        return resp
 
 
-def parse_detail_page(html, detail_url):
+http_cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTL)
+
+
+class HttpArchive:
     """
-    Estrae info aggiuntive dalla pagina di dettaglio:
-    - participants_no, participants_from, recommended_for
-    - accessibility, working_language, organiser
-    - participation_fee, accommodation_food, travel_reimbursement
-    - infopack_downloads (tutti i link nella sezione "Available downloads")
-    - application_procedure_url (link "Apply now!")
+    Archivio delle risposte HTTP per registrare e rigiocare uno scraping.
+    Un solo file in append, un record per risposta:
+    - intestazione ">II": lunghezza della chiave e del blocco compresso
+    - chiave: "METODO URL" in UTF-8 (non compressa, per l'indice)
+    - blocco zlib: JSON con status, header ed encoding, "\n", corpo
+    In lettura il file è mappato in memoria (mmap): l'indice chiave ->
+    posizione si costruisce leggendo solo le intestazioni e le chiavi, i
+    corpi si decomprimono quando servono. Per la stessa chiave vale
+    l'ultima risposta registrata.
     """
-    soup = BeautifulSoup(html, "html.parser")
 
-    # ---------- Training overview (blocchetto centrale) ----------
-    training_overview = ""
-    h3_overview = soup.find(
-        lambda tag: tag.name in ["h3", "h4"] and "Training overview" in tag.get_text()
-    )
-    if h3_overview:
-        parts = []
-        for sib in h3_overview.find_next_siblings():
-            if sib.name and sib.name.startswith("h"):
-                break
-            parts.append(sib.get_text("\n", strip=True))
-        training_overview = "\n".join(parts).strip()
+    HEADER = struct.Struct(">II")
 
-    participants_no = ""
-    participants_from = ""
-    recommended_for = ""
-    working_lang = ""
-    organiser = ""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.map = None
+        self.index = None
 
-    lines = [l.strip() for l in training_overview.splitlines() if l.strip()]
+    def record(self, method, url, resp):
+        meta = {
+            "status": resp.status_code,
+            "headers": dict(resp.headers),
+            "encoding": resp.encoding,
+            "reason": resp.reason,
+        }
+        key = f"{method} {url}".encode("utf-8")
+        blob = zlib.compress(json.dumps(meta).encode("utf-8") + b"\n" + resp.content, 6)
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, "ab")
+            self.file.write(self.HEADER.pack(len(key), len(blob)) + key + blob)
+            self.file.flush()
 
-    # Cerca "for" + "X participants" (possono essere su righe separate)
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        low = line.lower()
+    def _open(self):
+        if self.index is not None:
+            return
+        self.index = {}
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        pos = 0
+        size = len(self.map)
+        while pos + self.HEADER.size <= size:
+            key_len, blob_len = self.HEADER.unpack_from(self.map, pos)
+            start = pos + self.HEADER.size
+            end = start + key_len + blob_len
+            if end > size:
+                break  # record troncato (registrazione interrotta)
+            key = self.map[start:start + key_len].decode("utf-8")
+            self.index[key] = (start + key_len, blob_len)
+            pos = end
 
-        # Cerca "for"
-        if low == "for":
-            # La riga successiva dovrebbe essere "X participants"
-            if i + 1 < len(lines) and "participants" in lines[i + 1].lower():
-                participants_no = lines[i + 1].replace("participants", "").strip()
+    def lookup(self, method, url):
+        """Restituisce (meta, corpo) della risposta registrata, o None."""
+        with self.lock:
+            self._open()
+            entry = self.index.get(f"{method} {url}")
+            if entry is None:
+                return None
+            offset, length = entry
+            data = zlib.decompress(self.map[offset:offset + length])
+        meta, body = data.split(b"\n", 1)
+        return json.loads(meta), body
 
-                # Ora cerca "from" nelle righe successive
-                j = i + 2
-                countries = []
-                while j < len(lines):
-                    if lines[j].lower() == "from":
-                        j += 1
-                        continue
-                    if lines[j].lower().startswith("and recommended"):
-                        break
-                    # Raccogli tutte le righe fino a "and recommended for"
-                    countries.append(lines[j])
-                    j += 1
+    def __len__(self):
+        with self.lock:
+            self._open()
+            return len(self.index)
 
-                participants_from = " ".join(countries).strip()
-                i = j
-                continue
 
-        # recommended for
-        if "and recommended for" in low:
-            # L'elenco è sulla riga successiva
-            if i + 1 < len(lines):
-                recommended_for = lines[i + 1].strip()
+class RecordingAdapter(HTTPAdapter):
+    """
+    Adapter di rete che registra ogni risposta in un HttpArchive. Le
+    richieste partono senza header condizionali, così l'archivio contiene
+    sempre il corpo completo (mai un 304 vuoto).
+    """
 
-        # working language
-        if "working language(s):" in low:
-            # se la lingua è sulla stessa riga
-            after = line.split("Working language(s):", 1)[-1].strip()
-            if after:
-                working_lang = after
-            elif i + 1 < len(lines):
-                # altrimenti riga successiva
-                working_lang = lines[i + 1].strip()
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
 
-        # Organiser:
-        if low.startswith("organiser"):
-            # stesso pattern: può essere sulla riga stessa o successiva
-            after = line.split("Organiser", 1)[-1].replace(":", "").strip()
-            if after:
-                organiser = after
-            elif i + 1 < len(lines):
-                organiser = lines[i + 1].strip()
+    def send(self, request, **kwargs):
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+        resp = super().send(request, **kwargs)
+        self.archive.record(request.method, request.url, resp)
+        return resp
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Adapter che risponde dall'HttpArchive, senza rete. Rispetta
+    If-None-Match / If-Modified-Since (risponde 304) per esercitare anche la
+    cache HTTP; gli URL non registrati ricevono un 404.
+    """
+
+    def __init__(self, archive):
+        super().__init__()
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.url = request.url
+        resp.request = request
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            resp.status_code = 404
+            resp.reason = "Not Recorded"
+            resp._content = b""
+            return resp
+
+        meta, body = entry
+        resp.headers = CaseInsensitiveDict(meta["headers"])
+        # Il corpo registrato è già decompresso
+        resp.headers.pop("Content-Encoding", None)
+        resp.encoding = meta.get("encoding")
+        resp.status_code = meta["status"]
+        resp.reason = meta.get("reason")
+        resp._content = body
+        # Corpo già in memoria: anche iter_content (stream=True) legge da qui
+        resp._content_consumed = True
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if resp.status_code == 200 and (
+            (etag and request.headers.get("If-None-Match") == etag)
+            or (last_modified and request.headers.get("If-Modified-Since") == last_modified)
+        ):
+            resp.status_code = 304
+            resp.reason = "Not Modified"
+            resp._content = b""
+        return resp
+
+    def close(self):
+        pass
+
+
+http_archive = HttpArchive(HTTP_ARCHIVE_PATH) if HTTP_MODE in ("record", "replay") else None
+
+
+def transport_adapter():
+    """Adapter delle sessioni HTTP secondo SCRAPER_HTTP_MODE."""
+    if HTTP_MODE == "replay":
+        return ReplayAdapter(http_archive)
+    pool = {"pool_connections": MAX_WORKERS, "pool_maxsize": MAX_WORKERS}
+    if HTTP_MODE == "record":
+        return RecordingAdapter(http_archive, **pool)
+    return HTTPAdapter(**pool)
+
+
+class Event:
+    """
+    Un evento del calendario. Record con __slots__ (nessun __dict__ per
+    istanza) e un attributo per ciascuno dei CSV_FIELDNAMES, l'unico elenco
+    dei campi. from_row/to_row convertono da e verso i dict delle righe
+    (parser, CSV, archivio, JSON); get, [] e update funzionano come su un
+    dict, per il codice che completa l'evento per passi (lista, dettaglio).
+
+    I testi dei campi che si ripetono tra un evento e l'altro (tipo, paesi,
+    lingue, organizzatori, ...) sono internati con sys.intern: una sola copia
+    in memoria anche tenendo caricati molti eventi o snapshot.
+    """
+
+    __slots__ = tuple(CSV_FIELDNAMES)
+    FIELDS = __slots__
+    FIELD_SET = frozenset(FIELDS)
+    INTERNED = frozenset({
+        "type",
+        "location",
+        "participants_from",
+        "recommended_for",
+        "accessibility",
+        "working_language",
+        "organiser",
+        "participation_fee",
+        "accommodation_food",
+        "travel_reimbursement",
+        "fetch_error",
+    })
+    _values = attrgetter(*FIELDS)
+
+    @classmethod
+    def from_row(cls, row):
+        """Evento da un dict (campi mancanti = "", campi in più ignorati)."""
+        event = cls.__new__(cls)
+        get = row.get
+        interned = cls.INTERNED
+        for field in cls.FIELDS:
+            value = get(field)
+            if value is None:
+                value = ""
+            elif field in interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(event, field, value)
+        return event
+
+    def to_row(self):
+        """Dict con tutti i CSV_FIELDNAMES, nell'ordine del CSV."""
+        return dict(zip(self.FIELDS, self._values(self)))
+
+    def values(self):
+        return self._values(self)
+
+    def get(self, field, default=None):
+        if field in self.FIELD_SET:
+            return getattr(self, field)
+        return default
+
+    def __getitem__(self, field):
+        if field not in self.FIELD_SET:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in self.FIELD_SET:
+            raise KeyError(field)
+        if field in self.INTERNED and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, field, value)
+
+    def update(self, values):
+        for field, value in values.items():
+            self[field] = value
+
+    def __repr__(self):
+        return f"Event({self.title!r}, {self.detail_url!r})"
+
+
+class EventStore:
+    """
+    Archivio persistente degli eventi in SQLite (modalità WAL), con chiave
+    detail_url. Sostituisce la vecchia lista globale in memoria: i dati
+    sopravvivono ai riavvii e tutti i worker gunicorn leggono lo stesso file.
+    Ogni thread usa la propria connessione.
+    """
+
+    # Colonne indicizzate (filtri e ordinamenti frequenti)
+    INDEXED = ("application_deadline", "type", "dates", "deadline", "start_date", "sort_key")
+    # Colonne non testuali (le altre sono TEXT NOT NULL DEFAULT '')
+    COLUMN_TYPES = {"sort_key": "INTEGER"}
+    # Colonne nullable usate per ordinare: NULL (evento senza date) diventa
+    # una sentinella, in fondo all'ordine crescente. Con NULL il confronto
+    # del cursore (sort, detail_url) > (?, ?) non è mai vero e la
+    # paginazione salterebbe quelle righe
+    NULL_SORT_SENTINELS = {"sort_key": 2 ** 63 - 1}
+    # Campi filtrati per voce (lingue, luoghi): ogni voce dell'elenco separato
+    # da virgole va, normalizzata, nella tabella event_terms con indice,
+    # invece di un LIKE '%...%' che scorrerebbe tutta la tabella events
+    TERM_FIELDS = ("working_language", "location")
+    TERM_SEPARATORS = re.compile(r"\s*(?:[,;/]|\band\b)\s*", re.I)
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = list(fields)
+        self.local = threading.local()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self.schema_lock:
+            if self.schema_ready:
+                return
+            columns = ", ".join(
+                f"{field} {self._column_type(field)}"
+                for field in self.fields
+                if field != "detail_url"
+            )
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS events ("
+                    "detail_url TEXT PRIMARY KEY, "
+                    "position INTEGER NOT NULL DEFAULT 0, "
+                    "run_marker TEXT NOT NULL DEFAULT '', "
+                    "updated_at REAL NOT NULL DEFAULT 0, "
+                    f"{columns})"
+                )
+                # Colonne aggiunte dopo la creazione del file
+                existing = {row["name"] for row in conn.execute("PRAGMA table_info(events)")}
+                for field in self.fields:
+                    if field not in existing:
+                        conn.execute(
+                            f"ALTER TABLE events ADD COLUMN {field} {self._column_type(field)}"
+                        )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                has_terms = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_terms'"
+                ).fetchone()
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS event_terms ("
+                    "field TEXT NOT NULL, "
+                    "term TEXT NOT NULL, "
+                    "detail_url TEXT NOT NULL, "
+                    "PRIMARY KEY (field, term, detail_url)) WITHOUT ROWID"
+                )
+                if not has_terms:
+                    # Archivio creato prima della tabella: voci dagli eventi salvati
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO event_terms (field, term, detail_url) "
+                        "VALUES (?, ?, ?)",
+                        [
+                            term
+                            for row in conn.execute(
+                                f"SELECT detail_url, {', '.join(self.TERM_FIELDS)} FROM events"
+                            )
+                            for term in self._terms(dict(row))
+                        ],
+                    )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS runs ("
+                    "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "run_id TEXT NOT NULL UNIQUE, "
+                    "finished_at REAL NOT NULL, "
+                    "added INTEGER NOT NULL, "
+                    "removed INTEGER NOT NULL, "
+                    "modified INTEGER NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS changes ("
+                    "seq INTEGER NOT NULL, "
+                    "detail_url TEXT NOT NULL, "
+                    "kind TEXT NOT NULL, "
+                    "fields TEXT NOT NULL, "
+                    "event TEXT NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_seq ON changes(seq)")
+                # Differenze del run in corso, scritte man mano (vedi ChangeTracker)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS staged_changes ("
+                    "run_id TEXT NOT NULL, "
+                    "detail_url TEXT NOT NULL, "
+                    "kind TEXT NOT NULL, "
+                    "fields TEXT NOT NULL, "
+                    "event TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_staged_changes_run ON staged_changes(run_id)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS staging ("
+                    "detail_url TEXT PRIMARY KEY, "
+                    "run_id TEXT NOT NULL, "
+                    "position INTEGER NOT NULL, "
+                    "data TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_staging_run ON staging(run_id, position)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "job_id TEXT PRIMARY KEY, "
+                    "created_at REAL NOT NULL, "
+                    "data TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS locks ("
+                    "name TEXT PRIMARY KEY, "
+                    "owner TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS infopack_files ("
+                    "url TEXT PRIMARY KEY, "
+                    "path TEXT NOT NULL, "
+                    "sha256 TEXT NOT NULL, "
+                    "size INTEGER NOT NULL, "
+                    "fetched_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS application_links ("
+                    "procedure_url TEXT PRIMARY KEY, "
+                    "form_link TEXT NOT NULL, "
+                    "resolved_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_events_position ON events(position)")
+                for field in self.INDEXED:
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_events_{field} ON events({field})"
+                    )
+                for field in self.NULL_SORT_SENTINELS:
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_events_{field}_sort "
+                        f"ON events({self._sort_expression(field)}, detail_url)"
+                    )
+            self.schema_ready = True
+
+    def _sort_expression(self, field, value=None):
+        """Espressione di ordinamento di `field` (o del parametro `value`), mai NULL."""
+        target = field if value is None else value
+        if field in self.NULL_SORT_SENTINELS:
+            return f"COALESCE({target}, {self.NULL_SORT_SENTINELS[field]})"
+        return target
+
+    @classmethod
+    def normalize_term(cls, value):
+        return " ".join(value.split()).casefold()
+
+    @classmethod
+    def _terms(cls, event):
+        """Righe (campo, voce, detail_url) di event_terms per un evento."""
+        url = event["detail_url"]
+        return {
+            (field, cls.normalize_term(term), url)
+            for field in cls.TERM_FIELDS
+            for term in cls.TERM_SEPARATORS.split(event.get(field) or "")
+            if term.strip()
+        }
+
+    def _column_type(self, field):
+        return self.COLUMN_TYPES.get(field, "TEXT NOT NULL DEFAULT ''")
+
+    def _value(self, event, field):
+        value = event.get(field)
+        if field in self.COLUMN_TYPES:
+            return value if value not in ("", None) else None
+        return value or ""
+
+    def _upsert_sql(self):
+        columns = ["detail_url", "position", "run_marker", "updated_at"] + [
+            f for f in self.fields if f != "detail_url"
+        ]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+        return (
+            f"INSERT INTO events ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT(detail_url) DO UPDATE SET {updates}"
+        ), columns
+
+    def replace_all(self, events, batch_size=STORE_BATCH_SIZE, run_id=None, changes=None):
+        """
+        Sostituisce il contenuto con gli eventi di un run completo: upsert a
+        blocchi di `batch_size` righe, poi elimina gli eventi non più presenti.
+        Se passati i conteggi `changes` ({"added": n, ...}), registra anche le
+        differenze del run salvate con `stage_changes` (vedi ChangeTracker).
+        Tutto in un'unica transazione.
+        """
+        sql, columns = self._upsert_sql()
+        marker = run_id or uuid.uuid4().hex
+        now = time.time()
+        terms_sql = "INSERT OR IGNORE INTO event_terms (field, term, detail_url) VALUES (?, ?, ?)"
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM event_terms")
+            batch = []
+            terms = []
+            for position, event in enumerate(events):
+                if not event.get("detail_url"):
+                    continue
+                values = {"position": position, "run_marker": marker, "updated_at": now}
+                batch.append([
+                    values[c] if c in values else self._value(event, c)
+                    for c in columns
+                ])
+                terms.extend(self._terms(event))
+                if len(batch) >= batch_size:
+                    conn.executemany(sql, batch)
+                    conn.executemany(terms_sql, terms)
+                    batch = []
+                    terms = []
+            if batch:
+                conn.executemany(sql, batch)
+                conn.executemany(terms_sql, terms)
+            conn.execute("DELETE FROM events WHERE run_marker != ?", (marker,))
+            # La versione cambia a ogni run: è la base degli ETag di /api/events
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (marker,)
+            )
+            if changes is not None:
+                self._record_changes(conn, marker, now, changes)
+            # Righe in attesa di un run completato (o di uno interrotto)
+            conn.execute("DELETE FROM staging")
+            conn.execute("DELETE FROM staged_changes")
+
+    def stage(self, run_id, rows):
+        """
+        Salva subito le righe già complete di un run in corso (tabella
+        staging, `rows` = coppie (posizione, evento)): sopravvivono a un
+        crash e diventano definitive con `commit_staged`.
+        """
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO staging (detail_url, run_id, position, data) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (event["detail_url"], run_id, position, json.dumps(event))
+                    for position, event in rows
+                    if event.get("detail_url")
+                ],
+            )
+
+    def stage_changes(self, run_id, rows):
+        """
+        Salva le differenze di un run in corso (`rows` = tuple (detail_url,
+        kind, fields, event), già in JSON): con `commit_staged` passano allo
+        storico delle differenze.
+        """
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO staged_changes (run_id, detail_url, kind, fields, event) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows],
+            )
+
+    def iter_staged(self, run_id):
+        cursor = self._conn().execute(
+            "SELECT data FROM staging WHERE run_id = ? ORDER BY position", (run_id,)
+        )
+        for row in cursor:
+            yield json.loads(row[0])
+
+    def get_staged(self, detail_url, exclude_run):
+        """Riga salvata da un altro run (interrotto) per `detail_url`, o None."""
+        row = self._conn().execute(
+            "SELECT data FROM staging WHERE detail_url = ? AND run_id != ?",
+            (detail_url, exclude_run),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def commit_staged(self, run_id, changes=None, batch_size=STORE_BATCH_SIZE):
+        """Rende definitive le righe del run `run_id` (vedi replace_all)."""
+        self.replace_all(self.iter_staged(run_id), batch_size, run_id, changes)
+
+    def get_event(self, detail_url):
+        row = self._conn().execute(
+            f"SELECT {', '.join(self.fields)} FROM events WHERE detail_url = ?",
+            (detail_url,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _record_changes(self, conn, run_id, finished_at, counts):
+        seq = conn.execute(
+            "INSERT INTO runs (run_id, finished_at, added, removed, modified) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (run_id, finished_at, counts["added"], counts["removed"], counts["modified"]),
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO changes (seq, detail_url, kind, fields, event) "
+            "SELECT ?, detail_url, kind, fields, event FROM staged_changes "
+            "WHERE run_id = ? ORDER BY rowid",
+            (seq, run_id),
+        )
+        # Storico limitato agli ultimi CHANGES_KEEP_RUNS run
+        conn.execute("DELETE FROM runs WHERE seq <= ?", (seq - CHANGES_KEEP_RUNS,))
+        conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGES_KEEP_RUNS,))
+
+    def runs(self, after_seq=0):
+        """Run registrati dopo `after_seq`, dal più vecchio."""
+        return [
+            dict(row) for row in self._conn().execute(
+                "SELECT seq, run_id, finished_at, added, removed, modified "
+                "FROM runs WHERE seq > ? ORDER BY seq",
+                (after_seq,),
+            )
+        ]
+
+    def run_seq(self, run_id):
+        """Numero progressivo di un run, None se sconosciuto (o già eliminato)."""
+        row = self._conn().execute(
+            "SELECT seq FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def iter_run_changes(self, run_id, kind):
+        """Genera le differenze di tipo `kind` registrate per il run `run_id`."""
+        cursor = self._conn().execute(
+            "SELECT changes.detail_url, changes.fields, changes.event FROM changes "
+            "JOIN runs ON runs.seq = changes.seq "
+            "WHERE runs.run_id = ? AND changes.kind = ? ORDER BY changes.rowid",
+            (run_id, kind),
+        )
+        for row in cursor:
+            item = {"detail_url": row["detail_url"], "event": json.loads(row["event"])}
+            if kind == "modified":
+                item["fields"] = json.loads(row["fields"])
+            yield item
+
+    def iter_changes(self, after_seq=0):
+        """Genera le differenze dei run successivi ad `after_seq`, in ordine."""
+        cursor = self._conn().execute(
+            "SELECT seq, detail_url, kind, fields, event FROM changes "
+            "WHERE seq > ? ORDER BY seq, rowid",
+            (after_seq,),
+        )
+        for row in cursor:
+            yield {
+                "seq": row["seq"],
+                "detail_url": row["detail_url"],
+                "kind": row["kind"],
+                "fields": json.loads(row["fields"]),
+                "event": json.loads(row["event"]),
+            }
+
+    def iter_events(self):
+        """Genera gli eventi (dict) nell'ordine del calendario, senza caricarli tutti."""
+        cursor = self._conn().execute(
+            f"SELECT {', '.join(self.fields)} FROM events ORDER BY position"
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def count(self, where=(), params=()):
+        sql = "SELECT COUNT(*) FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._conn().execute(sql, list(params)).fetchone()[0]
+
+    def get_application_link(self, procedure_url, max_age):
+        """Link del form memorizzato se più recente di `max_age` secondi, altrimenti None."""
+        row = self._conn().execute(
+            "SELECT form_link FROM application_links "
+            "WHERE procedure_url = ? AND resolved_at >= ?",
+            (procedure_url, time.time() - max_age),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_application_link(self, procedure_url, form_link):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO application_links "
+                "(procedure_url, form_link, resolved_at) VALUES (?, ?, ?)",
+                (procedure_url, form_link, time.time()),
+            )
+
+    def get_infopack(self, url):
+        """File locale già scaricato per `url` (dict con path, sha256, size) o None."""
+        row = self._conn().execute(
+            "SELECT path, sha256, size FROM infopack_files WHERE url = ?", (url,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def set_infopack(self, url, path, sha256, size):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO infopack_files "
+                "(url, path, sha256, size, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, path, sha256, size, time.time()),
+            )
+
+    def save_job(self, job):
+        """Salva lo stato di un job (dict di ScrapeJob.to_dict), visibile a tutti i worker."""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, created_at, data) VALUES (?, ?, ?)",
+                (job["job_id"], job["created_at"], json.dumps(job)),
+            )
+
+    def load_job(self, job_id):
+        row = self._conn().execute(
+            "SELECT data FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune_jobs(self, keep):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE job_id NOT IN "
+                "(SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                (keep,),
+            )
+
+    def acquire_lock(self, name, owner, ttl):
+        """
+        Prende (o rinnova, se già di `owner`) il lock `name` per `ttl`
+        secondi. Restituisce False se lo tiene un altro e non è scaduto.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.owner = excluded.owner OR locks.expires_at < ?",
+                (name, owner, now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, name, value):
+        """
+        Salva `value` come valore di `name` (tabella meta) solo se è maggiore
+        di quello già salvato. Restituisce True a un solo chiamante per ogni
+        valore, anche tra worker diversi.
+        """
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value "
+                "WHERE meta.value < excluded.value",
+                (name, value),
+            )
+        return cursor.rowcount == 1
+
+    def release_lock(self, name, owner):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+    def lock_owner(self, name):
+        """Chi tiene il lock `name`, None se libero o scaduto."""
+        row = self._conn().execute(
+            "SELECT owner FROM locks WHERE name = ? AND expires_at >= ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def version(self):
+        """Identificativo dell'ultimo run salvato ("" se l'archivio è vuoto)."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else ""
+
+    def query(self, where, params, sort, descending, limit, after=None):
+        """
+        Pagina di eventi filtrati, in ordine (sort, detail_url).
+        `where` è una lista di condizioni SQL con i relativi `params`;
+        `after` è la coppia (valore di sort, detail_url) dell'ultima riga della
+        pagina precedente (paginazione a cursore, usa gli indici).
+        """
+        where = list(where)
+        params = list(params)
+        direction = "DESC" if descending else "ASC"
+        key = self._sort_expression(sort)
+        if after is not None:
+            where.append(
+                f"({key}, detail_url) {'<' if descending else '>'} "
+                f"({self._sort_expression(sort, '?')}, ?)"
+            )
+            params.extend(after)
+        sql = f"SELECT position, {', '.join(self.fields)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {key} {direction}, detail_url {direction} LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+
+event_store = EventStore(DB_PATH, CSV_FIELDNAMES)
+
+
+def parse_list_page(html):
+    """
+    Estrae gli eventi dalla pagina di lista SALTO (European Training Calendar).
+    Prova due metodi:
+    1. Cerca <h3> con link (metodo vecchio script)
+    2. Cerca tutti i link che puntano a /tools/european-training-calendar/training/
+    Usa BeautifulSoup, oppure lxml se scelto con SCRAPER_PARSER.
+    """
+    if _use_lxml():
+        try:
+            return _parse_list_page_lxml(html)
+        except (etree.LxmlError, ValueError) as e:
+            print(f"DEBUG: parser lxml fallito, uso BeautifulSoup: {e}")
+    return _parse_list_page_bs4(html)
+
+
+def parse_detail_page(html, detail_url):
+    """
+    Estrae info aggiuntive dalla pagina di dettaglio:
+    - participants_no, participants_from, recommended_for
+    - accessibility, working_language, organiser
+    - participation_fee, accommodation_food, travel_reimbursement
+    - infopack_downloads (primo link nella sezione "Available downloads")
+    - infopack_urls (tutti i link della sezione, uno per riga)
+    - application_procedure_url (link "Apply now!")
+    Usa BeautifulSoup, oppure lxml se scelto con SCRAPER_PARSER.
+    """
+    if _use_lxml():
+        try:
+            return _parse_detail_page_lxml(html, detail_url)
+        except (etree.LxmlError, ValueError) as e:
+            print(f"DEBUG: parser lxml fallito, uso BeautifulSoup: {e}")
+    return _parse_detail_page_bs4(html, detail_url)
+
+
+def _use_lxml():
+    return etree is not None and PARSER_BACKEND in ("lxml", "auto")
+
+
+class ParserPool:
+    """
+    Esegue i parser in un pool di `workers` processi: i thread del fetch
+    inviano i byte grezzi della risposta e ricevono i dict già estratti,
+    mentre il processo web (Flask/Socket.IO) resta libero. Il pool parte al
+    primo uso, con processi "spawn" (niente fork di un processo con thread).
+    Con workers=0, o se il pool si rompe, si analizza nel processo corrente.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self.executor
+
+    def run(self, func, resp, *args):
+        """func(corpo, encoding, *args) nel pool; `resp` è la risposta HTTP."""
+        # Stessa decodifica di resp.text
+        encoding = resp.encoding or resp.apparent_encoding
+        if self.workers <= 0:
+            return func(resp.content, encoding, *args)
+        try:
+            return self._executor().submit(func, resp.content, encoding, *args).result()
+        except BrokenProcessPool as e:
+            print(f"DEBUG: pool di parsing non disponibile, parsing nel processo: {e}")
+            with self.lock:
+                self.executor = None
+            return func(resp.content, encoding, *args)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+parser_pool = ParserPool(PARSE_WORKERS)
+
+
+def _decode(body, encoding):
+    return str(body, encoding or "utf-8", errors="replace")
+
+
+# Funzioni eseguite nei processi del ParserPool (devono essere picklabili:
+# a livello di modulo, argomenti e risultati semplici)
+
+def parse_list_bytes(body, encoding):
+    html = _decode(body, encoding)
+    events = parse_list_page(html)
+    return events, parse_list_page_count(html, len(events)), parse_list_pager(html)
+
+
+def parse_detail_bytes(body, encoding, detail_url):
+    return parse_detail_page(_decode(body, encoding), detail_url)
+
+
+def find_application_link_bytes(body, encoding):
+    return _find_external_application_link(_decode(body, encoding))
+
+
+# Parti della pagina che cambiano a ogni richiesta senza che cambi l'evento:
+# escluse dall'impronta del contenuto
+VOLATILE_PATTERNS = [
+    (re.compile(rb"<!--.*?-->", re.S), b""),
+    # Token CSRF / nonce in input nascosti, meta e attributi
+    (re.compile(rb"<(?:input|meta)\b[^>]*(?:csrf|token|nonce)[^>]*>", re.I), b""),
+    (re.compile(rb"\bnonce=\"[^\"]*\"", re.I), b""),
+    # Versioni degli asset e parametri anti-cache (/assets-version-1762415964/, ?v=...)
+    (re.compile(rb"assets-version-\d+"), b"assets-version"),
+    (re.compile(rb"([?&](?:v|t|ts|_)=)\d+"), rb"\1"),
+    # Orari di generazione della pagina (date con ore, minuti e secondi)
+    (re.compile(rb"\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?"), b""),
+    # Spazi: i parser dividono il testo in righe (strip, senza righe vuote),
+    # quindi conta solo se tra due parole c'è un a capo o no
+    (re.compile(rb"\s*\n\s*"), b"\n"),
+    (re.compile(rb"[ \t\r\f\v]+"), b" "),
+]
+
+
+def content_digest(body):
+    """
+    Impronta SHA-1 del corpo di una pagina, senza le parti volatili; dipende
+    anche da DETAIL_PARSER_VERSION.
+    """
+    for pattern, replacement in VOLATILE_PATTERNS:
+        body = pattern.sub(replacement, body)
+    digest = hashlib.sha1(b"%d\0" % DETAIL_PARSER_VERSION)
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _list_event_from_lines(title, url, lines, deadline_on_next_line):
+    """
+    Costruisce l'evento dalle righe di testo del suo blocco nella pagina lista:
+    tipo, date e luogo sono le righe attorno al titolo.
+    """
+    try:
+        idx = lines.index(title)
+    except ValueError:
+        idx = 0
+
+    type_ = ""
+    dates = ""
+    location = ""
+    app_deadline = ""
+
+    if idx > 0:
+        type_ = lines[idx - 1]
+    if idx + 1 < len(lines):
+        dates = lines[idx + 1]
+    if idx + 2 < len(lines):
+        location = lines[idx + 2]
+
+    for i, line in enumerate(lines):
+        if "Application deadline" in line:
+            if deadline_on_next_line:
+                if i + 1 < len(lines):
+                    app_deadline = lines[i + 1]
+            else:
+                app_deadline = line.split(":", 1)[-1].strip()
+            break
+
+    event = {
+        "title": title,
+        "type": type_,
+        "dates": dates,
+        "location": location,
+        "application_deadline": app_deadline,
+        "detail_url": url,
+    }
+    event.update(normalized_dates(dates, _find_deadline(lines, idx)))
+    return event
+
+
+def normalized_dates(dates, deadline):
+    """Campi normalizzati: start_date, end_date, deadline (ISO) e sort_key."""
+    start_date, end_date = parse_date_range(dates)
+    return {
+        "deadline": deadline,
+        "start_date": start_date,
+        "end_date": end_date,
+        "sort_key": date_sort_key(start_date),
+    }
+
+
+# ---------- Normalizzazione delle date ----------
+# SALTO scrive le date come "12-19 January 2026", "1 December 2025",
+# "28 November - 3 December 2025" o "30 December 2025 - 5 January 2026".
+# Molti eventi condividono le stesse stringhe: i parser sono memoizzati.
+
+_MONTHS = {
+    name[:3]: number
+    for number, name in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"],
+        start=1,
+    )
+}
+_SINGLE_DATE = re.compile(r"\b(\d{1,2})\s+([A-Za-z]+)\.?\s+(\d{4})\b")
+_DATE_RANGE = re.compile(
+    r"\b(\d{1,2})(?:\s+([A-Za-z]+)\.?)?(?:\s+(\d{4}))?"
+    r"\s*[-–—]\s*"
+    r"(\d{1,2})\s+([A-Za-z]+)\.?\s+(\d{4})\b"
+)
+
+
+def _make_date(day, month_name, year):
+    month = _MONTHS.get(month_name.lower()[:3]) if month_name else None
+    if not month:
+        return None
+    try:
+        return datetime.date(int(year), month, int(day))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date_range(text):
+    """
+    "12-19 January 2026" -> ("2026-01-12", "2026-01-19").
+    Una data singola dà inizio = fine; ("", "") se il testo non contiene date.
+    """
+    match = _DATE_RANGE.search(text or "")
+    if match:
+        d1, m1, y1, d2, m2, y2 = match.groups()
+        end = _make_date(d2, m2, y2)
+        if end:
+            start = _make_date(d1, m1 or m2, y1 or y2)
+            # "28 December - 3 January 2026": l'inizio è nell'anno precedente
+            if start and start > end and not y1:
+                start = _make_date(d1, m1 or m2, int(y2) - 1)
+            if start:
+                return start.isoformat(), end.isoformat()
+    date = parse_date(text)
+    return date, date
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    """"28 November 2025" -> "2025-11-28"; stringa vuota se non è una data."""
+    match = _SINGLE_DATE.search(text or "")
+    if not match:
+        return ""
+    date = _make_date(*match.groups())
+    return date.isoformat() if date else ""
+
+
+def date_sort_key(iso_date):
+    """Epoch (secondi, mezzanotte UTC) di una data ISO; None se vuota."""
+    if not iso_date:
+        return None
+    return calendar.timegm(datetime.date.fromisoformat(iso_date).timetuple())
+
+
+def _find_deadline(lines, idx):
+    """
+    Data ISO della scadenza dell'evento: la prima data dopo la riga
+    "Application deadline" che segue il titolo (la data può stare sulla
+    stessa riga o qualche riga sotto, dopo "(24h UTC)" e ":").
+    """
+    for i in range(idx, len(lines)):
+        if "Application deadline" in lines[i]:
+            for candidate in lines[i:i + 4]:
+                deadline = parse_date(candidate)
+                if deadline:
+                    return deadline
+            return ""
+    return ""
+
+
+def _parse_overview_lines(lines):
+    """
+    Analizza le righe del blocco "Training overview" e restituisce
+    participants_no, participants_from, recommended_for, working_language
+    e organiser.
+    """
+    participants_no = ""
+    participants_from = ""
+    recommended_for = ""
+    working_lang = ""
+    organiser = ""
+
+    # Cerca "for" + "X participants" (possono essere su righe separate)
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        low = line.lower()
+
+        # Cerca "for"
+        if low == "for":
+            # La riga successiva dovrebbe essere "X participants"
+            if i + 1 < len(lines) and "participants" in lines[i + 1].lower():
+                participants_no = lines[i + 1].replace("participants", "").strip()
+
+                # Ora cerca "from" nelle righe successive
+                j = i + 2
+                countries = []
+                while j < len(lines):
+                    if lines[j].lower() == "from":
+                        j += 1
+                        continue
+                    if lines[j].lower().startswith("and recommended"):
+                        break
+                    # Raccogli tutte le righe fino a "and recommended for"
+                    countries.append(lines[j])
+                    j += 1
+
+                participants_from = " ".join(countries).strip()
+                i = j
+                continue
+
+        # recommended for
+        if "and recommended for" in low:
+            # L'elenco è sulla riga successiva
+            if i + 1 < len(lines):
+                recommended_for = lines[i + 1].strip()
+
+        # working language
+        if "working language(s):" in low:
+            # se la lingua è sulla stessa riga
+            after = line.split("Working language(s):", 1)[-1].strip()
+            if after:
+                working_lang = after
+            elif i + 1 < len(lines):
+                # altrimenti riga successiva
+                working_lang = lines[i + 1].strip()
+
+        # Organiser:
+        if low.startswith("organiser"):
+            # stesso pattern: può essere sulla riga stessa o successiva
+            after = line.split("Organiser", 1)[-1].replace(":", "").strip()
+            if after:
+                organiser = after
+            elif i + 1 < len(lines):
+                organiser = lines[i + 1].strip()
+
+        i += 1
+
+    return {
+        "participants_no": participants_no,
+        "participants_from": participants_from,
+        "recommended_for": recommended_for,
+        "working_language": working_lang,
+        "organiser": organiser,
+    }
+
+
+# ---------- Backend BeautifulSoup (html.parser) ----------
+
+def _parse_list_page_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    events = []
+    seen_urls = set()
+
+    # METODO 1: cerca <h3> con link
+    for h3 in soup.find_all("h3"):
+        a = h3.find("a")
+        if not a:
+            continue
+        title = a.get_text(strip=True)
+        url = a.get("href", "").strip()
+        if url and not url.startswith("http"):
+            url = BASE_URL + url
+
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+
+        block = h3.parent
+        text = block.get_text("\n", strip=True)
+        lines = [l for l in text.split("\n") if l.strip()]
+
+        events.append(_list_event_from_lines(title, url, lines, False))
+
+    # METODO 2: se non ha trovato nulla con <h3>, cerca tutti i link diretti
+    if not events:
+        for link in soup.select(
+                "a[href*='/tools/european-training-calendar/training/']"
+        ):
+            title = link.get_text(strip=True)
+            if not title:
+                continue
+
+            detail_url = link.get("href", "").strip()
+            if detail_url and not detail_url.startswith("http"):
+                detail_url = BASE_URL + detail_url
+
+            if detail_url in seen_urls:
+                continue
+            seen_urls.add(detail_url)
+
+            # Contenitore principale del blocco evento
+            container = link.find_parent()
+            for _ in range(4):
+                if container and container.name not in ["body", "html"]:
+                    container = container.parent
+
+            text_block = container.get_text("\n", strip=True) if container else ""
+            lines = [l.strip() for l in text_block.split("\n") if l.strip()]
+
+            events.append(_list_event_from_lines(title, detail_url, lines, True))
+
+    return events
+
+
+def _parse_detail_page_bs4(html, detail_url):
+    soup = BeautifulSoup(html, "html.parser")
+
+    # ---------- Training overview (blocchetto centrale) ----------
+    training_overview = ""
+    h3_overview = soup.find(
+        lambda tag: tag.name in ["h3", "h4"] and "Training overview" in tag.get_text()
+    )
+    if h3_overview:
+        parts = []
+        for sib in h3_overview.find_next_siblings():
+            if sib.name and sib.name.startswith("h"):
+                break
+            parts.append(sib.get_text("\n", strip=True))
+        training_overview = "\n".join(parts).strip()
+
+    lines = [l.strip() for l in training_overview.splitlines() if l.strip()]
+    overview = _parse_overview_lines(lines)
+
+    # ---------- Accessibility info ----------
+    accessibility = ""
+    h_acc = soup.find(
+        lambda tag: tag.name in ["h3", "h4"] and "Accessibility info" in tag.get_text()
+    )
+    if h_acc:
+        parts = []
+        for sib in h_acc.find_next_siblings():
+            if sib.name and sib.name.startswith("h"):
+                break
+            parts.append(sib.get_text(" ", strip=True))
+        accessibility = " ".join(parts).strip()
+
+    # ---------- Costs section ----------
+    def section_after_heading(text):
+        h = soup.find(
+            lambda tag: tag.name in ["h3", "h4"] and text in tag.get_text()
+        )
+        if not h:
+            return ""
+        parts = []
+        for sib in h.find_next_siblings():
+            if sib.name and sib.name.startswith("h"):
+                break
+            parts.append(sib.get_text(" ", strip=True))
+        return " ".join(parts).strip()
+
+    participation_fee = section_after_heading("Participation fee")
+    accommodation_food = section_after_heading("Accommodation and food")
+    travel_reimbursement = section_after_heading("Travel reimbursement")
+
+    # ---------- Available downloads (infopack) ----------
+    # Cerca un elemento specifico (non <html>!) che contiene "Available downloads:"
+    # Raccoglie gli URL di tutti i file; infopack_downloads resta il PRIMO
+    infopack_urls = []
+
+    # Strategia 1: cerca un heading o strong/b con "Available downloads"
+    downloads_heading = None
+    for tag in soup.find_all(['h3', 'h4', 'h5', 'strong', 'b', 'p']):
+        if "Available downloads:" in tag.get_text():
+            downloads_heading = tag
+            break
+
+    if downloads_heading:
+        # Naviga i siblings successivi fino al prossimo heading
+        for sib in downloads_heading.find_next_siblings():
+            if sib.name and sib.name.startswith("h"):
+                break
+            # Tutti i link del PRIMO sibling che ne contiene
+            links = sib.find_all("a", href=True)
+            if links:
+                infopack_urls = [_absolute_url(a["href"]) for a in links]
+                break
+
+    # Strategia 2: se non trovato, cerca nel parent del testo "Available downloads:"
+    if not infopack_urls:
+        for element in soup.find_all(string=re.compile(r"Available downloads:")):
+            parent = element.parent
+            # Cerca link nel parent e nei siblings
+            for link in parent.find_next_siblings():
+                # Link consecutivi subito dopo il testo
+                if link.name == "a" and link.get("href"):
+                    infopack_urls.append(_absolute_url(link["href"]))
+                    continue
+                if infopack_urls:
+                    break
+                # Cerca anche dentro i siblings
+                links = link.find_all("a", href=True)
+                if links:
+                    infopack_urls = [_absolute_url(a["href"]) for a in links]
+                    break
+            if infopack_urls:
+                break
+
+    # ---------- Application procedure URL ("Apply now!") ----------
+    application_procedure_url = ""
+
+    # Il link contiene "Apply now!" ma anche altro testo attaccato
+    # Cerca un link il cui href contiene "/application-procedure/"
+    for link in soup.find_all("a", href=True):
+        if "/application-procedure/" in link["href"]:
+            app_href = link["href"]
+            if not app_href.startswith("http"):
+                app_href = BASE_URL + app_href
+            application_procedure_url = app_href
+            break
+
+    return {
+        "participants_no": overview["participants_no"],
+        "participants_from": overview["participants_from"],
+        "recommended_for": overview["recommended_for"],
+        "accessibility": accessibility,
+        "working_language": overview["working_language"],
+        "organiser": overview["organiser"],
+        "participation_fee": participation_fee,
+        "accommodation_food": accommodation_food,
+        "travel_reimbursement": travel_reimbursement,
+        "infopack_downloads": infopack_urls[0] if infopack_urls else "",
+        "infopack_urls": "\n".join(infopack_urls),
+        "application_procedure_url": application_procedure_url,
+    }
+
+
+# ---------- Backend lxml ----------
+# Stesso algoritmo del backend BeautifulSoup, ma l'albero è costruito in C da
+# libxml2 e la pagina di dettaglio viene percorsa una sola volta per trovare
+# tutte le sezioni. I testi sono estratti con le stesse regole di get_text()
+# di BeautifulSoup, così i due backend producono gli stessi dizionari.
+
+# Tag il cui testo BeautifulSoup esclude da get_text()
+_LXML_SKIPPED_TEXT = frozenset(("script", "style", "template", "rt", "rp"))
+
+# Heading delle sezioni della pagina di dettaglio
+_DETAIL_SECTIONS = (
+    "Training overview",
+    "Accessibility info",
+    "Participation fee",
+    "Accommodation and food",
+    "Travel reimbursement",
+)
+
+# I parser lxml non vanno condivisi tra thread: uno per thread
+_lxml_local = threading.local()
+
+
+def _lxml_document(html):
+    # libxml2 converte \r\n in \n, html.parser no: i \r nel testo diventano
+    # &#13; così restano anche nei testi estratti con lxml
+    if "\r" in html:
+        html = re.sub(r">[^<]*", lambda m: m.group(0).replace("\r", "&#13;"), html)
+    parser = getattr(_lxml_local, "parser", None)
+    if parser is None:
+        parser = _lxml_local.parser = lxml.html.HTMLParser(encoding="utf-8")
+    return lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+
+
+def _lxml_strings(el, out):
+    tag = el.tag
+    if not isinstance(tag, str) or tag in _LXML_SKIPPED_TEXT:
+        return
+    if el.text:
+        out.append(el.text)
+    for child in el:
+        _lxml_strings(child, out)
+        if child.tail:
+            out.append(child.tail)
+
+
+def _lxml_text(el, separator="", strip=False):
+    """Equivalente di Tag.get_text(separator, strip=strip) di BeautifulSoup."""
+    out = []
+    _lxml_strings(el, out)
+    if strip:
+        out = [t.strip() for t in out]
+        out = [t for t in out if t]
+    return separator.join(out)
+
+
+def _lxml_siblings_until_heading(el):
+    """I tag fratelli successivi di `el`, fino al prossimo heading escluso."""
+    for sib in el.itersiblings():
+        if not isinstance(sib.tag, str):
+            continue
+        if sib.tag.startswith("h"):
+            break
+        yield sib
+
+
+def _lxml_links(el):
+    """Tutti i <a href> discendenti di `el` (come el.find_all("a", href=True))."""
+    return [a for a in el.iterdescendants("a") if a.get("href") is not None]
+
+
+def _lxml_text_parents(root, needle):
+    """
+    In ordine di documento, il parent di ogni nodo di testo che contiene
+    `needle` (come soup.find_all(string=...) seguito da .parent).
+    """
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        if event == "start":
+            if el.text and needle in el.text:
+                yield el if isinstance(el.tag, str) else el.getparent()
+        elif el.tail and needle in el.tail:
+            yield el.getparent()
+
+
+def _absolute_url(href):
+    if not href.startswith("http"):
+        href = BASE_URL + href
+    return href
+
+
+def _parse_list_page_lxml(html):
+    root = _lxml_document(html)
+    events = []
+    seen_urls = set()
+
+    # METODO 1: cerca <h3> con link
+    for h3 in root.iter("h3"):
+        a = next(h3.iterdescendants("a"), None)
+        if a is None:
+            continue
+        title = _lxml_text(a, strip=True)
+        url = (a.get("href") or "").strip()
+        if url:
+            url = _absolute_url(url)
+
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+
+        text = _lxml_text(h3.getparent(), "\n", strip=True)
+        lines = [l for l in text.split("\n") if l.strip()]
+
+        events.append(_list_event_from_lines(title, url, lines, False))
+
+    # METODO 2: se non ha trovato nulla con <h3>, cerca tutti i link diretti
+    if not events:
+        for link in root.iter("a"):
+            href = link.get("href")
+            if href is None or "/tools/european-training-calendar/training/" not in href:
+                continue
+            title = _lxml_text(link, strip=True)
+            if not title:
+                continue
+
+            detail_url = href.strip()
+            if detail_url:
+                detail_url = _absolute_url(detail_url)
+
+            if detail_url in seen_urls:
+                continue
+            seen_urls.add(detail_url)
+
+            # Contenitore principale del blocco evento
+            container = link.getparent()
+            for _ in range(4):
+                if container is not None and container.tag not in ("body", "html"):
+                    container = container.getparent()
+
+            text_block = _lxml_text(container, "\n", strip=True) if container is not None else ""
+            lines = [l.strip() for l in text_block.split("\n") if l.strip()]
+
+            events.append(_list_event_from_lines(title, detail_url, lines, True))
+
+    return events
+
+
+def _parse_detail_page_lxml(html, detail_url):
+    root = _lxml_document(html)
+
+    # Unico passaggio sul documento: heading delle sezioni, elemento con
+    # "Available downloads:" e link alla application procedure
+    headings = {}
+    downloads_heading = None
+    application_procedure_url = ""
+    for el in root.iter():
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+        if tag in ("h3", "h4") and len(headings) < len(_DETAIL_SECTIONS):
+            text = _lxml_text(el)
+            for label in _DETAIL_SECTIONS:
+                if label not in headings and label in text:
+                    headings[label] = el
+        if downloads_heading is None and tag in ("h3", "h4", "h5", "strong", "b", "p"):
+            if "Available downloads:" in _lxml_text(el):
+                downloads_heading = el
+        if not application_procedure_url and tag == "a":
+            href = el.get("href")
+            if href is not None and "/application-procedure/" in href:
+                application_procedure_url = _absolute_url(href)
+
+    def section(label, separator):
+        h = headings.get(label)
+        if h is None:
+            return ""
+        parts = [
+            _lxml_text(sib, separator, strip=True)
+            for sib in _lxml_siblings_until_heading(h)
+        ]
+        return separator.join(parts).strip()
+
+    training_overview = section("Training overview", "\n")
+    lines = [l.strip() for l in training_overview.splitlines() if l.strip()]
+    overview = _parse_overview_lines(lines)
+
+    # ---------- Available downloads (infopack) ----------
+    infopack_urls = []
+    if downloads_heading is not None:
+        for sib in _lxml_siblings_until_heading(downloads_heading):
+            links = _lxml_links(sib)
+            if links:
+                infopack_urls = [_absolute_url(a.get("href")) for a in links]
+                break
+
+    # Strategia 2: cerca nei fratelli del parent del testo "Available downloads:"
+    if not infopack_urls:
+        for parent in _lxml_text_parents(root, "Available downloads:"):
+            if parent is None:
+                continue
+            for link in parent.itersiblings():
+                if not isinstance(link.tag, str):
+                    continue
+                if link.tag == "a" and link.get("href"):
+                    infopack_urls.append(_absolute_url(link.get("href")))
+                    continue
+                if infopack_urls:
+                    break
+                links = _lxml_links(link)
+                if links:
+                    infopack_urls = [_absolute_url(a.get("href")) for a in links]
+                    break
+            if infopack_urls:
+                break
+
+    return {
+        "participants_no": overview["participants_no"],
+        "participants_from": overview["participants_from"],
+        "recommended_for": overview["recommended_for"],
+        "accessibility": section("Accessibility info", " "),
+        "working_language": overview["working_language"],
+        "organiser": overview["organiser"],
+        "participation_fee": section("Participation fee", " "),
+        "accommodation_food": section("Accommodation and food", " "),
+        "travel_reimbursement": section("Travel reimbursement", " "),
+        "infopack_downloads": infopack_urls[0] if infopack_urls else "",
+        "infopack_urls": "\n".join(infopack_urls),
+        "application_procedure_url": application_procedure_url,
+    }
+
+
+def get_external_application_link(application_procedure_url, session=None):
+    """
+    Segue la pagina /application-procedure/... e estrae il link del bottone
+    "Proceed to the external online application" (es. Google Forms)
+    Passa da `application_links`: memo persistente e richieste duplicate
+    unificate. Solleva l'eccezione se la pagina non si riesce a scaricare.
+    """
+    return application_links.resolve(application_procedure_url, session)
+
+
+def _fetch_external_application_link(application_procedure_url, session):
+    """
+    Scarica la pagina di application procedure. Solleva solo per gli errori
+    temporanei (rete, RETRY_STATUSES); gli altri 4xx valgono "nessun link".
+    """
+    resp = throttled_get(session, application_procedure_url, timeout=10)
+    if 400 <= resp.status_code < 500 and resp.status_code not in RETRY_STATUSES:
+        # Pagina rimossa o non accessibile (404, 410, ...): riprovare non serve
+        print(f"DEBUG: application procedure {application_procedure_url}: HTTP {resp.status_code}")
+        return ""
+    resp.raise_for_status()
+    # Pagina invariata (304): riusa il link già estratto
+    if resp.not_modified and resp.parsed is not None:
+        return resp.parsed
+
+    link = parser_pool.run(find_application_link_bytes, resp)
+    session.cache.set_parsed(application_procedure_url, link)
+    return link
+
+
+class ApplicationLinkResolver:
+    """
+    Risolve gli URL /application-procedure/ nel link del form esterno
+    (forms.gle, typeform, ...):
+    - memo persistente nell'archivio SQLite, valida per `ttl` secondi: le
+      formazioni invariate non costano richieste
+    - richieste contemporanee per lo stesso URL unificate in una sola
+    - ogni URL risolto una volta sola per run: il risultato (anche l'errore)
+      resta valido fino a `reset_stats`, chiamato all'inizio di ogni run
+    - connessioni riusate dalla sessione dello scraper (o da una sessione
+      condivisa, se chiamato da solo)
+    """
+
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.session = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        # url -> Future già completato (link o eccezione) del run in corso
+        self.results = {}
+        self.memo_hits = 0
+        self.deduplicated = 0
+        self.fetched = 0
+
+    def stats(self):
+        return {
+            "memo_hits": self.memo_hits,
+            "deduplicated": self.deduplicated,
+            "fetched": self.fetched,
+        }
+
+    def _default_session(self):
+        with self.lock:
+            if self.session is None:
+                self.session = build_session()
+            return self.session
+
+    def resolve(self, url, session=None):
+        if not url:
+            return ""
+
+        with self.lock:
+            future = self.results.get(url) or self.inflight.get(url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[url] = future
+            else:
+                self.deduplicated += 1
+        if not owner:
+            return future.result()
+
+        try:
+            link = self._resolve(url, session or self._default_session())
+        except Exception as e:
+            future.set_exception(e)
+            with self.lock:
+                del self.inflight[url]
+                self.results[url] = future
+            raise
+        future.set_result(link)
+        with self.lock:
+            del self.inflight[url]
+            self.results[url] = future
+        return link
+
+    def _resolve(self, url, session):
+        memo = self.store.get_application_link(url, self.ttl)
+        if memo is not None:
+            with self.lock:
+                self.memo_hits += 1
+            return memo
+
+        with self.lock:
+            self.fetched += 1
+        # Gli errori restano solo per il run (results), non nella memo persistente
+        link = _fetch_external_application_link(url, session)
+        self.store.set_application_link(url, link)
+        return link
+
+
+application_links = ApplicationLinkResolver(event_store, APPLICATION_LINK_TTL)
+
+
+def _find_external_application_link(html):
+    """Estrae il link al form esterno dalla pagina /application-procedure/."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Cerca il link "Proceed to the external online application"
+    external_link = soup.find(
+        "a", string=re.compile(r"Proceed to the external", re.IGNORECASE)
+    )
+    if external_link and external_link.get("href"):
+        return external_link["href"]
+
+    # Alternativa: cerca qualsiasi link a form esterni noti
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if any(
+                domain in href
+                for domain in [
+                    "forms.gle",
+                    "google.com/forms",
+                    "typeform.com",
+                    "surveymonkey.com",
+                    "jotform.com",
+                ]
+        ):
+            return href
+
+    return ""
+
+
+# ---------- Copia locale degli infopack ----------
+
+class InfopackMirror:
+    """
+    Copia locale dei file infopack ("Available downloads") in `directory`:
+    - un file per contenuto: il nome è lo sha256 del file (più l'estensione),
+      quindi lo stesso PDF linkato da più eventi o URL viene salvato una volta
+    - URL già scaricati (indice nell'archivio SQLite e file presente)
+      saltati senza richieste; richieste contemporanee per lo stesso URL
+      unificate in una sola
+    - download in streaming a blocchi in un file .part: se si interrompe, il
+      run successivo riprende da dove era arrivato con una richiesta Range
+    - file oltre `max_bytes` scartati
+    """
+
+    def __init__(self, store, directory, max_bytes):
+        self.store = store
+        self.directory = directory
+        self.partial_dir = os.path.join(directory, ".partial")
+        self.max_bytes = max_bytes
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.present = 0
+        self.downloaded = 0
+        self.resumed = 0
+        self.duplicates = 0
+        self.failed = 0
+
+    def stats(self):
+        return {
+            "present": self.present,
+            "downloaded": self.downloaded,
+            "resumed": self.resumed,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+        }
+
+    def mirror(self, url, session):
+        """Restituisce (sha256, percorso) del file di `url`, scaricandolo se serve."""
+        with self.lock:
+            future = self.inflight.get(url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[url] = future
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._mirror(url, session)
+        except Exception as e:
+            with self.lock:
+                del self.inflight[url]
+                self.failed += 1
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.inflight[url]
+        future.set_result(result)
+        return result
+
+    def _mirror(self, url, session):
+        known = self.store.get_infopack(url)
+        if known and os.path.exists(known["path"]):
+            with self.lock:
+                self.present += 1
+            return known["sha256"], known["path"]
+
+        sha256, path, size = self._download(url, session)
+        self.store.set_infopack(url, path, sha256, size)
+        return sha256, path
+
+    def _download(self, url, session):
+        os.makedirs(self.partial_dir, exist_ok=True)
+        key = os.path.join(self.partial_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+        part_path = key + ".part"
+        # Accanto al .part: ETag / Last-Modified della versione che contiene
+        validator_path = key + ".json"
+
+        # Si riprende solo con un validatore (If-Range): se il file sul
+        # server è cambiato, arriva intero (200) invece del seguito
+        offset = 0
+        headers = {}
+        if os.path.exists(part_path):
+            validator = _read_infopack_validator(validator_path)
+            if validator:
+                offset = os.path.getsize(part_path)
+                headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+            else:
+                self._discard(part_path, validator_path)
+
+        resp = throttled_get(session, url, headers=headers, stream=True, timeout=30)
+        try:
+            if offset and (
+                resp.status_code == 416
+                or (resp.status_code == 206 and _content_range_start(resp) != offset)
+            ):
+                # Il .part non corrisponde al file sul server: da capo
+                resp.close()
+                self._discard(part_path, validator_path)
+                return self._download(url, session)
+            resp.raise_for_status()
+
+            digest = hashlib.sha256()
+            if resp.status_code == 206 and offset:
+                with self.lock:
+                    self.resumed += 1
+                # L'impronta comprende anche la parte già scaricata
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(INFOPACK_CHUNK_SIZE), b""):
+                        digest.update(block)
+                mode = "ab"
+            else:
+                # Prima richiesta, Range ignorato o file cambiato (200): il
+                # server manda il file intero
+                offset = 0
+                mode = "wb"
+                _write_infopack_validator(validator_path, resp)
+
+            size = offset
+            declared = resp.headers.get("Content-Length")
+            if declared and offset + int(declared) > self.max_bytes:
+                raise InfopackTooLarge(offset + int(declared), self.max_bytes)
+            with open(part_path, mode) as f:
+                for chunk in resp.iter_content(INFOPACK_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise InfopackTooLarge(size, self.max_bytes)
+                    digest.update(chunk)
+                    f.write(chunk)
+        except InfopackTooLarge:
+            # Inutile riprenderlo: si butta anche la parte scaricata
+            self._discard(part_path, validator_path)
+            raise
+        finally:
+            resp.close()
+
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        sha256 = digest.hexdigest()
+        path = os.path.join(self.directory, sha256 + _infopack_extension(resp))
+        if os.path.exists(path):
+            # Stesso contenuto già salvato per un altro URL
+            os.remove(part_path)
+            with self.lock:
+                self.duplicates += 1
+        else:
+            os.replace(part_path, path)
+            with self.lock:
+                self.downloaded += 1
+        return sha256, path, size
+
+    @staticmethod
+    def _discard(*paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _read_infopack_validator(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("if_range")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_infopack_validator(path, resp):
+    """
+    Salva il validatore per If-Range: ETag forte oppure Last-Modified (un
+    ETag debole "W/" non è ammesso). Senza validatore il .part non si riprende.
+    """
+    etag = resp.headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else resp.headers.get("Last-Modified")
+    if not validator:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"if_range": validator}, f)
+
+
+def _content_range_start(resp):
+    """Primo byte di una risposta 206 (Content-Range: bytes 100-999/1000), None se assente."""
+    match = re.match(r"bytes\s+(\d+)-", resp.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+class InfopackTooLarge(ValueError):
+    def __init__(self, size, limit):
+        super().__init__(f"file troppo grande: {size} byte (limite {limit})")
+
+
+def _infopack_extension(resp):
+    """Estensione del file: dal nome in Content-Disposition o dal Content-Type."""
+    match = re.search(
+        r'filename\*?=(?:UTF-8\'\')?"?([^";]+)', resp.headers.get("Content-Disposition", "")
+    )
+    if match:
+        extension = os.path.splitext(match.group(1).strip())[1]
+        if extension:
+            return extension.lower()
+    content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+    if not content_type:
+        return ""
+    return mimetypes.guess_extension(content_type) or ""
+
+
+infopacks = InfopackMirror(event_store, INFOPACK_DIR, INFOPACK_MAX_BYTES)
+
+
+# ---------- Export (CSV / NDJSON / JSON) in streaming ----------
+
+class _RowBuffer:
+    """Destinazione per csv.writer che restituisce il testo di ogni riga."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def pop(self):
+        text = "".join(self.parts)
+        self.parts.clear()
+        return text
+
+
+def iter_csv(rows):
+    """Genera il CSV riga per riga, senza tenerlo tutto in memoria."""
+    buffer = _RowBuffer()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.pop()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.pop()
+
+
+def iter_ndjson(rows):
+    """Un oggetto JSON per riga (newline-delimited JSON)."""
+    for row in rows:
+        record = {field: row.get(field, "") for field in CSV_FIELDNAMES}
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def iter_json(rows):
+    """Un array JSON, generato un elemento alla volta."""
+    yield "["
+    separator = "\n"
+    for row in rows:
+        record = {field: row.get(field, "") for field in CSV_FIELDNAMES}
+        yield separator + json.dumps(record, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+# formato -> (generatore, content type, estensione del file)
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8", "csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson; charset=utf-8", "ndjson"),
+    "json": (iter_json, "application/json; charset=utf-8", "json"),
+}
+
+
+def _batched(chunks, size=64 * 1024):
+    """Raggruppa i pezzi piccoli in blocchi di circa `size` caratteri."""
+    parts = []
+    length = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield "".join(parts)
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def save_csv_to_file():
+    """
+    Salva il CSV nella cartella output/ per Make.com o altri flussi automatici
+    """
+    if not event_store.count():
+        print("DEBUG: nessun dato da salvare")
+        return
+
+    # Crea la cartella output se non esiste
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    csv_path = CSV_PATH
+
+    # Scrive su un file temporaneo e poi lo sostituisce: il CSV precedente
+    # (stato di partenza della modalità incrementale) non resta mai a metà
+    tmp_path = csv_path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        for chunk in iter_csv(event_store.iter_events()):
+            f.write(chunk)
+    os.replace(tmp_path, csv_path)
+
+    print(f"DEBUG: CSV salvato in {csv_path}")
+    report(f"CSV salvato in {csv_path}")
+
+
+class SnapshotStore:
+    """
+    Snapshot versionati dei risultati: dopo ogni run completato l'archivio
+    viene esportato in `directory` come salto_events_<data UTC>_<run_id>.csv.gz.
+    Dopo un nuovo deploy l'archivio SQLite può essere vuoto: `ensure_loaded`,
+    al primo uso nel processo, lo riempie con l'ultimo snapshot.
+    """
+
+    PREFIX = "salto_events_"
+    SUFFIX = ".csv.gz"
+    STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+
+    def __init__(self, directory, keep, max_age_days):
+        self.directory = directory
+        self.keep = keep
+        self.max_age_days = max_age_days
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def paths(self):
+        """Snapshot presenti, dal più vecchio (il nome inizia con la data)."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(self.PREFIX) and name.endswith(self.SUFFIX)
+        )
+
+    def _parts(self, path):
+        # (istante UTC, run_id) dal nome del file
+        stamp, _, run_id = os.path.basename(path)[len(self.PREFIX):-len(self.SUFFIX)].partition("_")
+        moment = datetime.datetime.strptime(stamp, self.STAMP_FORMAT)
+        return calendar.timegm(moment.timetuple()), run_id
+
+    def save(self, run_id):
+        """Esporta l'archivio in un nuovo snapshot (scrittura atomica) e applica la conservazione."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime(self.STAMP_FORMAT, time.gmtime())
+        path = os.path.join(self.directory, f"{self.PREFIX}{stamp}_{run_id}{self.SUFFIX}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in _gzip_chunks(_batched(iter_csv(event_store.iter_events()))):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        print(f"DEBUG: snapshot salvato in {path}")
+        self.prune()
+        return path
+
+    def prune(self):
+        """
+        Elimina gli snapshot oltre gli ultimi `keep` e quelli più vecchi di
+        `max_age_days` giorni; il più recente non viene mai eliminato.
+        """
+        older = self.paths()[:-1]
+        removed = older[:max(len(older) + 1 - self.keep, 0)]
+        if self.max_age_days > 0:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += [
+                path for path in older[len(removed):] if self._parts(path)[0] < cutoff
+            ]
+        for path in removed:
+            os.remove(path)
+            print(f"DEBUG: snapshot eliminato: {path}")
+        return removed
+
+    def ensure_loaded(self):
+        """
+        Solo la prima volta nel processo: se l'archivio è vuoto lo carica
+        dall'ultimo snapshot. Restituisce il numero di eventi caricati.
+        """
+        if self.loaded:
+            return 0
+        with self.lock:
+            if self.loaded:
+                return 0
+            self.loaded = True
+            paths = self.paths()
+            if not paths or event_store.count():
+                return 0
+            return self.load(paths[-1])
+
+    def load(self, path):
+        """Sostituisce il contenuto dell'archivio con quello dello snapshot."""
+        _, run_id = self._parts(path)
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            # La versione dell'archivio torna quella del run dello snapshot
+            event_store.replace_all(csv.DictReader(f), run_id=run_id)
+        count = event_store.count()
+        print(f"DEBUG: caricati {count} eventi dallo snapshot {path}")
+        if not os.path.exists(CSV_PATH):
+            save_csv_to_file()
+        return count
+
+
+snapshots = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_KEEP, SNAPSHOT_MAX_AGE_DAYS)
+
+
+def parse_list_page_count(html, events_per_page):
+    """
+    Ricava il numero di pagine lista dalla prima pagina:
+    - dal totale "We found <span>57</span> training offers"
+    - dal numero più alto nel pager (<ol class="pagination">)
+    Restituisce None se nessuno dei due è presente.
+    """
+    pages = []
+
+    match = re.search(
+        r"We found\s*(?:<[^>]+>\s*)*(\d+)\s*(?:</[^>]+>\s*)*training offers", html
+    )
+    if match and events_per_page:
+        total = int(match.group(1))
+        pages.append(-(-total // events_per_page))
+
+    pager = re.search(r'<ol class="pagination[^"]*">(.*?)</ol>', html, re.S)
+    if pager:
+        numbers = re.findall(r">\s*(\d+)\s*<", pager.group(1))
+        if numbers:
+            pages.append(max(int(n) for n in numbers))
+
+    return max(pages) if pages else None
+
+
+def parse_list_pager(html):
+    """
+    Query di un link del pager (<ol class="pagination">) come lista di coppie,
+    o None se la pagina non ne ha: cambiando solo b_offset si ottengono le
+    altre pagine, con filtri e ordinamento della prima.
+    """
+    pager = re.search(r'<ol class="pagination[^"]*">(.*?)</ol>', html, re.S)
+    if not pager:
+        return None
+    match = re.search(r'href="([^"]*\bb_offset=\d+[^"]*)"', pager.group(1))
+    if not match:
+        return None
+    return parse_qsl(urlsplit(unescape(match.group(1))).query, keep_blank_values=True)
+
+
+def list_page_url(page, page_size, pager_query=None):
+    """
+    URL della pagina lista `page` (da 1), costruito come i link del pager:
+    b_offset = (page - 1) * b_limit. Senza pager solo b_offset e b_limit,
+    con b_limit = `page_size` (gli eventi della prima pagina).
+    """
+    params = dict(pager_query or ())
+    try:
+        limit = int(params.get("b_limit") or page_size)
+    except ValueError:
+        limit = page_size
+    params["b_offset"] = (page - 1) * limit
+    params["b_limit"] = limit
+    return f"{SEARCH_URL}?{urlencode(params)}"
+
+
+def fetch_list_page(session, url, page, total_pages):
+    """
+    Scarica e analizza la pagina lista `url` (la `page`-esima).
+    Restituisce (eventi, numero di pagine, query del pager) oppure None in
+    caso di errore.
+    """
+    msg = f"Caricamento pagina {page}/{total_pages}..."
+    report(msg)
+    print(f"DEBUG: {msg}")
+
+    try:
+        with metrics.timed("list_fetch"):
+            resp = throttled_get(session, url, timeout=15)
+        resp.raise_for_status()
+        print(f"DEBUG: URL chiamato: {resp.url}")
+    except Exception as e:
+        err = f"Errore caricamento pagina {page}: {e}"
+        report(err)
+        print(f"DEBUG: {err}")
+        return None
+
+    if resp.not_modified and resp.parsed is not None:
+        events = resp.parsed
+        pages = parse_list_page_count(resp.text, len(events))
+        pager = parse_list_pager(resp.text)
+    else:
+        with metrics.timed("list_parse"):
+            events, pages, pager = parser_pool.run(parse_list_bytes, resp)
+        session.cache.set_parsed(url, events)
+    print(f"DEBUG: pagina {page}, eventi trovati: {len(events)}")
+    return events, pages, pager
+
+
+class PreviousEvents:
+    """
+    Eventi dell'esecuzione precedente, letti dall'archivio SQLite uno alla
+    volta quando servono (per detail_url), senza caricarli tutti in memoria.
+    Se l'archivio è vuoto si usa il CSV salvato in output/.
+    """
+
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+        self.rows = None
+        if not store.count() and os.path.exists(CSV_PATH):
+            with open(CSV_PATH, newline="", encoding="utf-8") as f:
+                self.rows = {
+                    row["detail_url"]: Event.from_row(row)
+                    for row in csv.DictReader(f)
+                    if row.get("detail_url")
+                }
+
+    def get(self, detail_url):
+        if not detail_url:
+            return None
+        if self.rows is not None:
+            return self.rows.get(detail_url)
+        return self.store.get_event(detail_url)
+
+    def latest(self, detail_url):
+        """
+        Come get, ma preferisce la riga salvata da un run interrotto (più
+        recente dell'ultimo run completo): la ripresa dopo un crash non
+        riscarica i dettagli già ottenuti.
+        """
+        if not detail_url:
+            return None
+        return self.store.get_staged(detail_url, self.run_id) or self.get(detail_url)
+
+    def items(self):
+        if self.rows is not None:
+            return iter(self.rows.items())
+        return ((row["detail_url"], row) for row in self.store.iter_events())
+
+
+def reuse_previous_detail(event, prev):
+    """
+    Se l'evento è invariato rispetto a `prev` (stessi LIST_CHANGE_FIELDS e
+    dettaglio scaricato senza errori) copia i campi di dettaglio già noti e
+    restituisce True; altrimenti il dettaglio va riscaricato.
+    """
+    unchanged = prev is not None and not prev.get("fetch_error") and all(
+        prev.get(field, "") == event.get(field, "") for field in LIST_CHANGE_FIELDS
+    )
+    if unchanged:
+        event.update({field: prev.get(field, "") for field in DETAIL_FIELDS})
+        event["fetch_error"] = ""
+    return unchanged
+
+
+class ChangeTracker:
+    """
+    Differenze tra il run precedente (`previous`) e gli eventi del run
+    corrente, aggiunti uno alla volta man mano che sono completi. Ogni
+    differenza (detail_url, tipo, event = la riga completa, per i rimossi
+    l'ultima nota; per le modificate anche fields = {campo: {"old": ...,
+    "new": ...}}) va nell'archivio (`store.stage_changes`) a blocchi di
+    `batch_size`: in memoria restano solo gli URL visti e i conteggi
+    `counts` = {"added": n, "removed": n, "modified": n}.
+    """
+
+    # L'impronta cambia anche per differenze della pagina che non toccano i campi
+    # infopack_files dipende dalla copia locale (facoltativa), non dall'evento
+    # fetch_error è lo stato dell'ultimo download: un errore temporaneo non
+    # cambia l'evento
+    COMPARED = [
+        field for field in CSV_FIELDNAMES
+        if field not in ("detail_url", "detail_digest", "infopack_files", "fetch_error")
+    ]
+
+    def __init__(self, previous, store, run_id, batch_size=STORE_BATCH_SIZE):
+        self.previous = previous
+        self.store = store
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.seen = set()
+        self.counts = {"added": 0, "removed": 0, "modified": 0}
+        self.batch = []
+
+    def add(self, event):
+        url = event.get("detail_url")
+        if not url or url in self.seen:
+            return
+        self.seen.add(url)
+        row = _change_row(event)
+        prev = self.previous.get(url)
+        if prev is None:
+            self._record(url, "added", row)
+            return
+        prev = _change_row(prev)
+        fields = {
+            field: {"old": prev[field], "new": row[field]}
+            for field in self.COMPARED
+            if prev[field] != row[field]
+        }
+        if fields:
+            self._record(url, "modified", row, fields)
+
+    def missing(self):
+        """Genera gli eventi del run precedente non (ancora) visti in questo."""
+        for url, prev in self.previous.items():
+            if url not in self.seen:
+                yield prev
+
+    def remove(self, prev):
+        self._record(prev["detail_url"], "removed", _change_row(prev))
+
+    def _record(self, url, kind, row, fields=None):
+        self.counts[kind] += 1
+        self.batch.append((url, kind, json.dumps(fields or {}), json.dumps(row)))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.store.stage_changes(self.run_id, self.batch)
+            self.batch = []
+
+
+def _change_row(event):
+    # Valori come nel CSV: il CSV del run precedente ha solo stringhe
+    return {
+        field: "" if event.get(field) is None else str(event.get(field))
+        for field in CSV_FIELDNAMES
+    }
+
+
+def merge_changes(changes):
+    """
+    Accorpa le differenze di più run (da EventStore.iter_changes) in una sola
+    per evento: aggiunto poi modificato resta aggiunto, aggiunto poi rimosso
+    sparisce, rimosso poi ricomparso diventa modificato, più modifiche si
+    sommano tenendo il primo "old" e l'ultimo "new".
+    """
+    merged = {}
+    for change in changes:
+        url = change["detail_url"]
+        kind = change["kind"]
+        fields = change["fields"]
+        prev = merged.pop(url, None)
+        if prev is not None:
+            if prev["kind"] == "added":
+                if kind == "removed":
+                    continue
+                kind, fields = "added", {}
+            elif prev["kind"] == "removed":
+                old = prev["event"]
+                kind = "modified"
+                new = change["event"]
+                fields = {
+                    field: {"old": old.get(field, ""), "new": new.get(field, "")}
+                    for field in ChangeTracker.COMPARED
+                    if old.get(field, "") != new.get(field, "")
+                }
+            elif kind == "modified":
+                fields = dict(prev["fields"])
+                for field, values in change["fields"].items():
+                    old = fields[field]["old"] if field in fields else values["old"]
+                    fields[field] = {"old": old, "new": values["new"]}
+                fields = {f: v for f, v in fields.items() if v["old"] != v["new"]}
+        if kind == "modified" and not fields:
+            continue
+        merged[url] = {"kind": kind, "fields": fields, "event": change["event"]}
+
+    result = {"added": [], "removed": [], "modified": []}
+    for url, change in merged.items():
+        item = {"detail_url": url, "event": change["event"]}
+        if change["kind"] == "modified":
+            item["fields"] = change["fields"]
+        result[change["kind"]].append(item)
+    return result
+
+
+def write_changes_file(run_id, previous_run, store):
+    """
+    Salva le differenze del run (già registrate in `store`) in
+    output/changes/<run_id>.json, scritte una alla volta (scrittura atomica),
+    e tiene solo gli ultimi CHANGES_KEEP_RUNS file.
+    """
+    os.makedirs(CHANGES_DIR, exist_ok=True)
+    path = os.path.join(CHANGES_DIR, f"{run_id}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(f'  "run_id": {json.dumps(run_id)},\n')
+        f.write(f'  "previous_run": {json.dumps(previous_run)}')
+        for kind in ("added", "removed", "modified"):
+            f.write(f',\n  "{kind}": [')
+            separator = "\n"
+            for item in store.iter_run_changes(run_id, kind):
+                text = json.dumps(item, indent=2, ensure_ascii=False)
+                f.write(separator + textwrap.indent(text, "    "))
+                separator = ",\n"
+            f.write("]" if separator == "\n" else "\n  ]")
+        f.write("\n}\n")
+    os.replace(tmp_path, path)
+
+    files = sorted(
+        (os.path.join(CHANGES_DIR, name) for name in os.listdir(CHANGES_DIR)
+         if name.endswith(".json")),
+        key=os.path.getmtime,
+    )
+    for old in files[:-CHANGES_KEEP_RUNS]:
+        os.remove(old)
+    return path
+
+
+def build_session():
+    """
+    Sessione HTTP dello scraper: User-Agent del browser, pool di connessioni
+    abbastanza grande per tutti i thread, cache HTTP (GET condizionali) e
+    trasporto scelto da SCRAPER_HTTP_MODE (rete, registrazione o replay).
+    """
+    http_session = requests.Session()
+    http_session.headers.update(
+        {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                          "AppleWebKit/537.36 (KHTML, like Gecko) "
+                          "Chrome/115.0.0.0 Safari/537.36"
+        }
+    )
+    adapter = transport_adapter()
+    http_session.mount("http://", adapter)
+    http_session.mount("https://", adapter)
+    return CachedSession(http_session, http_cache)
+
+
+def fetch_event_detail(session, event, position, total, previous=None):
+    """
+    Scarica e analizza la pagina di dettaglio di un evento (eseguita nei
+    thread del pool). Aggiorna il dizionario `event` sul posto.
+
+    Se la pagina ha la stessa impronta (content_digest) di quella da cui
+    vengono i campi di `previous`, i campi si riusano senza rianalizzarla.
+
+    Se il dettaglio (o il link del form) non si riesce a scaricare, l'errore
+    finisce in `fetch_error` e restano i valori del run precedente
+    (`previous`, la riga salvata), così il prossimo run riprova solo questi.
+    """
+    detail_url = event.get("detail_url", "")
+    if not detail_url:
+        return
+
+    # Solo sul log del server: ai client arriva l'avanzamento aggregato
+    print(f"DEBUG: [{position}/{total}] {event['title']}")
+
+    try:
+        with metrics.timed("detail_fetch"):
+            resp = throttled_get(session, detail_url, timeout=15)
+        resp.raise_for_status()
+        digest = content_digest(resp.content)
+        # Pagina invariata (304): niente parsing, si riusano i campi in cache
+        # (se estratti dalla versione attuale dei parser)
+        if (resp.not_modified and resp.parsed is not None
+                and resp.parsed.get("detail_digest") == digest):
+            detail = dict(resp.parsed)
+        elif (previous and not previous.get("fetch_error")
+                and previous.get("detail_digest") == digest):
+            # Stesso contenuto dell'ultima volta: niente parsing
+            detail = {
+                field: previous.get(field, "")
+                for field in DETAIL_FIELDS if field != "application_form_link"
+            }
+            metrics.record_parse_skip()
+            session.cache.set_parsed(detail_url, detail)
+        else:
+            with metrics.timed("detail_parse"):
+                detail = parser_pool.run(parse_detail_bytes, resp, detail_url)
+            detail["detail_digest"] = digest
+            session.cache.set_parsed(detail_url, detail)
+
+        # Get external application form link
+        if detail["application_procedure_url"]:
+            print(f"    → Getting application form link...")
+            try:
+                with metrics.timed("external_link"):
+                    external_form_link = get_external_application_link(
+                        detail["application_procedure_url"], session
+                    )
+                detail["fetch_error"] = ""
+            except Exception as e:
+                print(f"    Error fetching application link: {e}")
+                external_form_link = previous.get("application_form_link", "") if previous else ""
+                detail["fetch_error"] = f"application link: {e}"
+            detail["application_form_link"] = external_form_link
+        else:
+            detail["application_form_link"] = ""
+            detail["fetch_error"] = ""
+
+        # Merge detail info into event
+        event.update(detail)
+
+    except Exception as e:
+        print(f"DEBUG: errore dettaglio {detail_url}: {e}")
+        report(f"Errore dettaglio {event.get('title', detail_url)}: {e}")
+        # Restano i valori dell'ultimo run riuscito (vuoti se non ce n'è uno)
+        for field in DETAIL_FIELDS:
+            event[field] = previous.get(field, "") if previous else ""
+        event["fetch_error"] = str(e) or type(e).__name__
+
+
+def iter_list_events(session, counts, job=None):
+    """
+    Stadio delle pagine lista: genera gli eventi pagina per pagina,
+    nell'ordine del calendario. Conta in `counts` gli eventi ("listed") e le
+    pagine non caricate ("list_errors").
+    """
+    # La prima pagina dice quante pagine ci sono (pager / totale risultati)
+    # e come sono fatti i link alle altre (b_offset / b_limit)
+    first = fetch_list_page(session, SEARCH_URL, 1, "?")
+    if first is None:
+        counts["list_errors"] += 1
+        return
+    page_events, total_pages, pager = first
+    counts["listed"] += len(page_events)
+    yield from page_events
+    page_size = len(page_events)
+
+    if total_pages is None:
+        # Numero di pagine sconosciuto: si procede una pagina alla volta
+        # finché una pagina non restituisce eventi
+        page = 1
+        while page_events and page < MAX_LIST_PAGES:
+            page += 1
+            result = fetch_list_page(
+                session, list_page_url(page, page_size, pager), page, "?"
+            )
+            if result is None:
+                counts["list_errors"] += 1
+                break
+            page_events = result[0]
+            counts["listed"] += len(page_events)
+            yield from page_events
+    elif total_pages > 1 and page_events:
+        # Le pagine restanti in parallelo; i risultati si leggono in ordine
+        # e ci si ferma alla prima pagina vuota
+        last_page = min(total_pages, MAX_LIST_PAGES)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = [
+                pool.submit(
+                    fetch_list_page, session, list_page_url(page, page_size, pager),
+                    page, last_page,
+                )
+                for page in range(2, last_page + 1)
+            ]
+            for future in futures:
+                result = future.result()
+                if result is None:
+                    counts["list_errors"] += 1
+                    continue
+                if not result[0]:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                counts["listed"] += len(result[0])
+                yield from result[0]
+
+    # Ora si sa quanti dettagli ci sono da completare
+    if job:
+        job.set_total(counts["listed"])
+
+
+def enrich_events(session, events, previous, incremental, counts, job=None):
+    """
+    Stadio dei dettagli: per ogni evento in arrivo scarica il dettaglio nel
+    pool di thread (in modalità incrementale riusa quello del run precedente
+    se l'evento è invariato) e genera gli eventi completi nello stesso
+    ordine. Al massimo DETAIL_WINDOW eventi in volo.
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for position, row in enumerate(events, start=1):
+            event = Event.from_row(row)
+            prev = previous.latest(event.detail_url)
+            if incremental and reuse_previous_detail(event, prev):
+                counts["reused"] += 1
+                future = Future()
+                future.set_result(None)
+            else:
+                future = pool.submit(fetch_event_detail, session, event, position, "?", prev)
+            pending.append((future, event))
+            # Escono in ordine: il primo in coda appena è pronto, oppure si
+            # aspetta lui quando la finestra è piena
+            while pending and (len(pending) >= DETAIL_WINDOW or pending[0][0].done()):
+                yield _completed_event(pending.popleft(), counts, job)
+        while pending:
+            yield _completed_event(pending.popleft(), counts, job)
+
+
+def _completed_event(item, counts, job):
+    future, event = item
+    future.result()
+    failed = bool(event.get("fetch_error"))
+    if failed:
+        counts["failed"] += 1
+    if job:
+        job.advance(error=failed)
+    return event
+
+
+def mirror_infopacks(session, events):
+    """
+    Stadio facoltativo dopo i dettagli (SCRAPER_INFOPACK_MIRROR=1): copia in
+    locale tutti i file di `infopack_urls` (INFOPACK_WORKERS download in
+    parallelo) e scrive in `infopack_files` una riga "<sha256>  <percorso>"
+    per ogni file copiato (formato di sha256sum). Gli eventi escono nello
+    stesso ordine, al massimo DETAIL_WINDOW in volo.
+    """
+    # Sessione senza cache HTTP: i file si leggono in streaming
+    http_session = session.session
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=INFOPACK_WORKERS) as pool:
+        for event in events:
+            urls = [url for url in event.get("infopack_urls", "").splitlines() if url]
+            futures = [pool.submit(infopacks.mirror, url, http_session) for url in urls]
+            pending.append((futures, urls, event))
+            while pending and (
+                len(pending) >= DETAIL_WINDOW or all(f.done() for f in pending[0][0])
+            ):
+                yield _mirrored_event(pending.popleft())
+        while pending:
+            yield _mirrored_event(pending.popleft())
+
+
+def _mirrored_event(item):
+    futures, urls, event = item
+    lines = []
+    for future, url in zip(futures, urls):
+        try:
+            sha256, path = future.result()
+        except Exception as e:
+            # Non è un errore dell'evento: il file si riprova al prossimo run
+            print(f"DEBUG: errore infopack {url}: {e}")
+            report(f"Errore infopack {url}: {e}")
+            continue
+        lines.append(f"{sha256}  {path}")
+    event["infopack_files"] = "\n".join(lines)
+    return event
+
+
+class RunWriter:
+    """
+    Destinazione delle righe di un run: appena complete vanno nella tabella
+    staging dell'archivio e in coda al CSV parziale `csv_path`, scritte a
+    blocchi di `batch_size` righe o al più ogni `flush_interval` secondi.
+    """
+
+    def __init__(self, store, run_id, csv_path, batch_size=STORE_BATCH_SIZE,
+                 flush_interval=PARTIAL_FLUSH_INTERVAL):
+        self.store = store
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.batch = []
+        self.flushed_at = time.monotonic()
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        self.file = open(csv_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDNAMES, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, event):
+        row = event.to_row()
+        self.writer.writerow(row)
+        self.batch.append((self.count, row))
+        self.count += 1
+        if (
+            len(self.batch) >= self.batch_size
+            or time.monotonic() - self.flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.store.stage(self.run_id, self.batch)
+            self.batch = []
+        self.file.flush()
+        self.flushed_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def scrape_events(incremental=False, job=None):
+    """
+    Funzione principale di scraping: raccoglie eventi dalle pagine lista,
+    poi visita ogni dettaglio per estrarre tutti i campi.
+    Gli stadi sono generatori collegati (pagine lista -> dettagli -> righe
+    salvate): ogni evento prosegue appena pronto e la memoria non cresce con
+    il calendario. I dettagli vengono scaricati in parallelo (MAX_WORKERS
+    thread), con concorrenza per host e rate limit gestiti da `throttle`.
+
+    Con incremental=True riparte dagli eventi dell'esecuzione precedente:
+    scarica i dettagli solo degli eventi nuovi o modificati e rimuove quelli
+    spariti dal calendario.
+
+    Se viene passato un ScrapeJob, ne aggiorna fase e avanzamento.
+    Le righe complete finiscono subito in coda a PARTIAL_CSV_PATH e nella
+    tabella staging dell'archivio (sopravvivono a un crash); alla fine
+    diventano definitive in un'unica transazione: chi legge durante lo
+    scraping vede sempre l'ultimo run completo.
+    Restituisce il numero di eventi.
+    """
+    run_id = job.id if job else uuid.uuid4().hex
+    metrics.start_run(run_id)
+    try:
+        count = _run_scrape(incremental, job, run_id)
+    except Exception:
+        write_run_summary(metrics.finish_run("error"))
+        raise
+    summary = metrics.finish_run(
+        "done",
+        count,
+        incremental=incremental,
+        changes=_run_change_counts(run_id),
+        failed_events=event_store.count(["fetch_error != ''"]),
+        http_cache=http_cache.stats(),
+        application_links=application_links.stats(),
+        infopacks=infopacks.stats() if INFOPACK_MIRROR else None,
+    )
+    write_run_summary(summary)
+    if job:
+        job.summary = summary
+    return count
+
+
+def _run_change_counts(run_id):
+    seq = event_store.run_seq(run_id)
+    run = event_store.runs(seq - 1)[0] if seq else {}
+    return {kind: run.get(kind, 0) for kind in ("added", "removed", "modified")}
+
+
+def write_run_summary(summary):
+    """Salva il riepilogo JSON del run in output/runs/<run_id>.json."""
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    path = os.path.join(RUNS_DIR, f"{summary['run_id']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    # Copia dell'ultimo riepilogo, letta da /api/runs/last
+    tmp_path = LAST_RUN_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, LAST_RUN_PATH)
+
+
+def _run_scrape(incremental, job, run_id):
+    # Dopo un nuovo deploy il run precedente può essere solo nello snapshot
+    snapshots.ensure_loaded()
+    # Il run precedente serve anche al run completo: i dettagli che non si
+    # riescono a scaricare mantengono gli ultimi valori validi
+    previous = PreviousEvents(event_store, run_id)
+    counts = {"list_errors": 0, "listed": 0, "reused": 0, "failed": 0}
+
+    session = build_session()
+    # L'indice della cache va riletto: un altro worker può averla aggiornata
+    http_cache.reload()
+    http_cache.reset_stats()
+    application_links.reset_stats()
+    infopacks.reset_stats()
+
+    print("DEBUG: inizio scraping pagine lista...")
+    if job:
+        job.set_progress("detail", 0, None)
+
+    tracker = ChangeTracker(previous, event_store, run_id)
+    writer = RunWriter(event_store, run_id, PARTIAL_CSV_PATH)
+    removed = 0
+    try:
+        events = iter_list_events(session, counts, job)
+        events = enrich_events(session, events, previous, incremental, counts, job)
+        if INFOPACK_MIRROR:
+            events = mirror_infopacks(session, events)
+        for event in events:
+            tracker.add(event)
+            writer.write(event)
+
+        print(f"DEBUG: totale eventi raccolti dalla lista: {counts['listed']}")
+        report(f"Totale eventi trovati: {counts['listed']}")
+
+        if counts["list_errors"] and not counts["listed"]:
+            # Nessuna pagina lista caricata: l'archivio resta quello del run precedente
+            raise RuntimeError("pagine lista non caricate, archivio non modificato")
+
+        for prev in list(tracker.missing()):
+            if counts["list_errors"]:
+                # Con pagine lista non caricate non si può sapere se gli eventi
+                # mancanti sono davvero spariti: si tengono quelli precedenti
+                # (anche nel run completo)
+                writer.write(Event.from_row(prev))
+            else:
+                tracker.remove(prev)
+                removed += 1
+    finally:
+        writer.close()
+        tracker.flush()
+
+    if incremental:
+        msg = (
+            f"Modalità incrementale: {counts['listed'] - counts['reused']} nuovi/modificati, "
+            f"{counts['reused']} invariati, {removed} rimossi"
+        )
+        report(msg)
+        print(f"DEBUG: {msg}")
+
+    # Le righe del run diventano definitive, insieme alle differenze
+    # rispetto al run precedente
+    changes = tracker.counts
+    previous_run = event_store.version() or None
+    with metrics.timed("store_write"):
+        event_store.commit_staged(run_id, changes)
+    write_changes_file(run_id, previous_run, event_store)
+    msg = (
+        f"Differenze dal run precedente: {changes['added']} nuovi, "
+        f"{changes['removed']} rimossi, {changes['modified']} modificati"
+    )
+    report(msg)
+    print(f"DEBUG: {msg}")
+
+    # Salva automaticamente il CSV
+    if job:
+        job.set_progress("save", 0, None)
+    with metrics.timed("csv_write"):
+        save_csv_to_file()
+        # Lo snapshot è la base dopo un riavvio: solo da un elenco completo
+        if counts["list_errors"]:
+            msg = f"{counts['list_errors']} pagine lista non caricate: snapshot non salvato"
+            report(msg)
+            print(f"DEBUG: {msg}")
+        else:
+            snapshots.save(run_id)
+    if os.path.exists(PARTIAL_CSV_PATH):
+        os.remove(PARTIAL_CSV_PATH)
 
-        i += 1
+    failed = counts["failed"]
+    if failed:
+        msg = f"{failed} dettagli non scaricati: verranno ripresi al prossimo run"
+        report(msg)
+        print(f"DEBUG: {msg}")
 
-    # ---------- Accessibility info ----------
-    accessibility = ""
-    h_acc = soup.find(
-        lambda tag: tag.name in ["h3", "h4"] and "Accessibility info" in tag.get_text()
-    )
-    if h_acc:
-        parts = []
-        for sib in h_acc.find_next_siblings():
-            if sib.name and sib.name.startswith("h"):
-                break
-            parts.append(sib.get_text(" ", strip=True))
-        accessibility = " ".join(parts).strip()
+    msg = f"Pagine di dettaglio invariate, non rianalizzate: {metrics.current('parse_skipped')}"
+    report(msg)
+    print(f"DEBUG: {msg}")
 
-    # ---------- Costs section ----------
-    def section_after_heading(text):
-        h = soup.find(
-            lambda tag: tag.name in ["h3", "h4"] and text in tag.get_text()
+    if INFOPACK_MIRROR:
+        stats = infopacks.stats()
+        msg = (
+            f"Infopack: {stats['downloaded']} scaricati ({stats['resumed']} ripresi), "
+            f"{stats['present']} già presenti, {stats['duplicates']} duplicati, "
+            f"{stats['failed']} errori"
         )
-        if not h:
-            return ""
-        parts = []
-        for sib in h.find_next_siblings():
-            if sib.name and sib.name.startswith("h"):
-                break
-            parts.append(sib.get_text(" ", strip=True))
-        return " ".join(parts).strip()
+        report(msg)
+        print(f"DEBUG: {msg}")
 
-    participation_fee = section_after_heading("Participation fee")
-    accommodation_food = section_after_heading("Accommodation and food")
-    travel_reimbursement = section_after_heading("Travel reimbursement")
+    stats = http_cache.stats()
+    msg = f"Cache HTTP: {stats['hits']} hit, {stats['misses']} miss"
+    report(msg)
+    print(f"DEBUG: {msg}")
 
-    # ---------- Available downloads (infopack) ----------
-    # Cerca un elemento specifico (non <html>!) che contiene "Available downloads:"
-    # Salva solo l'URL del PRIMO link trovato
-    infopack_downloads = ""
+    stats = application_links.stats()
+    msg = (
+        f"Link candidatura: {stats['fetched']} scaricati, "
+        f"{stats['memo_hits']} dalla memo, {stats['deduplicated']} duplicati"
+    )
+    report(msg)
+    print(f"DEBUG: {msg}")
 
-    # Strategia 1: cerca un heading o strong/b con "Available downloads"
-    downloads_heading = None
-    for tag in soup.find_all(['h3', 'h4', 'h5', 'strong', 'b', 'p']):
-        if "Available downloads:" in tag.get_text():
-            downloads_heading = tag
-            break
+    report("Scraping completato!")
+    if not job:
+        # Con un job, "scraping_done" arriva alla sua stanza da JobRunner
+        socketio.emit("scraping_done", {"count": writer.count})
+    print("DEBUG: scraping completato!")
+    return writer.count
 
-    if downloads_heading:
-        # Naviga i siblings successivi fino al prossimo heading
-        for sib in downloads_heading.find_next_siblings():
-            if sib.name and sib.name.startswith("h"):
-                break
-            # Trova il PRIMO link in questo sibling
-            first_link = sib.find("a", href=True)
-            if first_link:
-                href = first_link["href"]
-                if not href.startswith("http"):
-                    href = BASE_URL + href
-                infopack_downloads = href
-                break  # Prendi solo il primo link
 
-    # Strategia 2: se non trovato, cerca nel parent del testo "Available downloads:"
-    if not infopack_downloads:
-        for element in soup.find_all(string=re.compile(r"Available downloads:")):
-            parent = element.parent
-            # Cerca link nel parent e nei siblings
-            for link in parent.find_next_siblings():
-                if link.name == "a" and link.get("href"):
-                    href = link["href"]
-                    if not href.startswith("http"):
-                        href = BASE_URL + href
-                    infopack_downloads = href
-                    break
-                # Cerca anche dentro i siblings
-                first_a = link.find("a", href=True)
-                if first_a:
-                    href = first_a["href"]
-                    if not href.startswith("http"):
-                        href = BASE_URL + href
-                    infopack_downloads = href
-                    break
-            if infopack_downloads:
-                break
+# ========== SOCKET.IO (UNO O PIÙ WORKER) ==========
 
-    # ---------- Application procedure URL ("Apply now!") ----------
-    application_procedure_url = ""
+class SqliteQueueManager(PubSubManager):
+    """
+    Coda dei messaggi Socket.IO su un file SQLite locale, al posto di Redis:
+    ogni worker scrive gli emit nella tabella `queue` e un thread legge
+    quelli degli altri worker (polling ogni `poll_interval` secondi).
+    Basta per più worker sulla stessa macchina; i messaggi più vecchi di
+    `retention` secondi vengono eliminati.
+    """
 
-    # Il link contiene "Apply now!" ma anche altro testo attaccato
-    # Cerca un link il cui href contiene "/application-procedure/"
-    for link in soup.find_all("a", href=True):
-        if "/application-procedure/" in link["href"]:
-            app_href = link["href"]
-            if not app_href.startswith("http"):
-                app_href = BASE_URL + app_href
-            application_procedure_url = app_href
-            break
+    name = "sqlite"
 
-    return {
-        "participants_no": participants_no,
-        "participants_from": participants_from,
-        "recommended_for": recommended_for,
-        "accessibility": accessibility,
-        "working_language": working_lang,
-        "organiser": organiser,
-        "participation_fee": participation_fee,
-        "accommodation_food": accommodation_food,
-        "travel_reimbursement": travel_reimbursement,
-        "infopack_downloads": infopack_downloads,
-        "application_procedure_url": application_procedure_url,
-    }
+    def __init__(self, path, channel="flask-socketio", write_only=False, logger=None,
+                 poll_interval=0.1, retention=60):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.local = threading.local()
 
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS queue ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "channel TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, "
+                    "payload TEXT NOT NULL)"
+                )
+            self.local.conn = conn
+        return conn
+
+    def _publish(self, data):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO queue (channel, created_at, payload) VALUES (?, ?, ?)",
+                (self.channel, now, json.dumps(data)),
+            )
+            conn.execute("DELETE FROM queue WHERE created_at < ?", (now - self.retention,))
+
+    def _listen(self):
+        conn = self._conn()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM queue").fetchone()[0]
+        while True:
+            rows = conn.execute(
+                "SELECT id, payload FROM queue WHERE id > ? AND channel = ? ORDER BY id",
+                (last_id, self.channel),
+            ).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield payload
+            self.server.sleep(self.poll_interval)
 
-def get_external_application_link(application_procedure_url):
+
+def socketio_options():
     """
-    Segue la pagina /application-procedure/... e estrae il link del bottone
-    "Proceed to the external online application" (es. Google Forms)
+    Opzioni di SocketIO secondo SCRAPER_SOCKETIO_QUEUE e SCRAPER_ASYNC_MODE.
+    Con la coda (più worker) si accetta solo il trasporto websocket: senza
+    sessioni "sticky" le richieste di long-polling di una stessa sessione
+    arriverebbero a worker diversi ("Invalid session").
     """
-    if not application_procedure_url:
-        return ""
+    options = {"cors_allowed_origins": "*", "async_mode": ASYNC_MODE}
+    if SOCKETIO_QUEUE == "sqlite":
+        options["client_manager"] = SqliteQueueManager(SOCKETIO_QUEUE_DB)
+    elif SOCKETIO_QUEUE:
+        options["message_queue"] = SOCKETIO_QUEUE
+    if SOCKETIO_QUEUE:
+        options["transports"] = ["websocket"]
+    return options
 
-    try:
-        resp = requests.get(application_procedure_url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
 
-        # Cerca il link "Proceed to the external online application"
-        external_link = soup.find(
-            "a", string=re.compile(r"Proceed to the external", re.IGNORECASE)
-        )
-        if external_link and external_link.get("href"):
-            return external_link["href"]
-
-        # Alternativa: cerca qualsiasi link a form esterni noti
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            if any(
-                    domain in href
-                    for domain in [
-                        "forms.gle",
-                        "google.com/forms",
-                        "typeform.com",
-                        "surveymonkey.com",
-                        "jotform.com",
-                    ]
-            ):
-                return href
+socketio = SocketIO(app, **socketio_options())
 
-        return ""
-    except Exception as e:
-        print(f"    Error fetching application link from {application_procedure_url}: {e}")
-        return ""
 
+# ========== JOB DI SCRAPING IN BACKGROUND ==========
 
-def save_csv_to_file():
+class ScrapeJob:
     """
-    Salva il CSV nella cartella output/ per Make.com o altri flussi automatici
+    Uno scraping eseguito in background, con stato e avanzamento.
+    Avanzamento e messaggi di log si accumulano nel job; `flush()` li invia
+    alla stanza Socket.IO del job (id del job) in un unico messaggio
+    "progress", solo se qualcosa è cambiato dall'invio precedente.
     """
-    if not scraped_data:
-        print("DEBUG: nessun dato da salvare")
-        return
 
-    # Crea la cartella output se non esiste
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    def __init__(self, incremental=False):
+        self.id = uuid.uuid4().hex
+        self.incremental = incremental
+        self.status = "queued"  # queued | running | done | error
+        self.phase = ""
+        self.done = 0
+        self.total = None
+        self.errors = 0
+        self.phase_started = None
+        self.saved_eta = None  # ETA letto dall'archivio (job di un altro worker)
+        self.logs = deque(maxlen=PROGRESS_MAX_LOGS)
+        self.dirty = False
+        self.count = None
+        self.error = None
+        self.summary = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
 
-    csv_path = os.path.join(OUTPUT_DIR, "salto_events_complete.csv")
+    def set_progress(self, phase, done, total):
+        with self.lock:
+            if phase != self.phase:
+                self.phase_started = time.monotonic()
+            self.phase = phase
+            self.done = done
+            self.total = total
+            self.dirty = True
 
-    fieldnames = [
-        "title",
-        "type",
-        "dates",
-        "location",
-        "application_deadline",
-        "participants_no",
-        "participants_from",
-        "recommended_for",
-        "accessibility",
-        "working_language",
-        "organiser",
-        "participation_fee",
-        "accommodation_food",
-        "travel_reimbursement",
-        "infopack_downloads",
-        "application_procedure_url",
-        "application_form_link",
-        "detail_url",
-    ]
+    def set_total(self, total):
+        with self.lock:
+            self.total = total
+            self.dirty = True
 
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(scraped_data)
+    def advance(self, error=False):
+        with self.lock:
+            self.done += 1
+            if error:
+                self.errors += 1
+            self.dirty = True
 
-    print(f"DEBUG: CSV salvato in {csv_path}")
-    socketio.emit("log", {"message": f"CSV salvato in {csv_path}"})
+    def log(self, message):
+        with self.lock:
+            self.logs.append(message)
+            self.dirty = True
+
+    def _eta(self):
+        # Secondi stimati alla fine della fase, al ritmo tenuto finora
+        if self.phase_started is None:
+            return self.saved_eta
+        if not self.total or not self.done or self.phase_started is None:
+            return None
+        elapsed = time.monotonic() - self.phase_started
+        return round(elapsed / self.done * max(self.total - self.done, 0), 1)
+
+    def _progress(self):
+        return {
+            "phase": self.phase,
+            "done": self.done,
+            "total": self.total,
+            "errors": self.errors,
+            "eta_seconds": self._eta(),
+        }
+
+    def flush(self):
+        """
+        Invia l'avanzamento accumulato alla stanza del job (se cambiato) e lo
+        salva nell'archivio, dove lo leggono gli altri worker.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            message = {"job_id": self.id, "status": self.status, **self._progress()}
+            message["logs"] = list(self.logs)
+            self.logs.clear()
+            self.dirty = False
+        socketio.emit("progress", message, to=self.id)
+        event_store.save_job(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data):
+        """Job di un altro worker, ricostruito dallo stato salvato (sola lettura)."""
+        job = cls(data.get("incremental", False))
+        job.id = data["job_id"]
+        job.status = data["status"]
+        progress = data.get("progress") or {}
+        job.phase = progress.get("phase", "")
+        job.done = progress.get("done", 0)
+        job.total = progress.get("total")
+        job.errors = progress.get("errors", 0)
+        job.saved_eta = progress.get("eta_seconds")
+        for field in ("count", "error", "summary", "created_at", "started_at", "finished_at"):
+            setattr(job, field, data.get(field))
+        if not job.active:
+            job.finished.set()
+        return job
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "incremental": self.incremental,
+                "progress": self._progress(),
+                "count": self.count,
+                "error": self.error,
+                "summary": self.summary,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
 
 
-def scrape_events():
+class JobRunner:
     """
-    Funzione principale di scraping: raccoglie eventi dalle pagine lista,
-    poi visita ogni dettaglio per estrarre tutti i campi.
+    Esegue gli scraping in background, uno alla volta: se un job è già in
+    corso, una nuova richiesta si aggancia a quello invece di avviarne un altro.
+    Vale anche tra worker diversi: il job in corso tiene il lock "scrape"
+    nell'archivio SQLite e il suo stato è salvato nella tabella jobs.
     """
-    global scraped_data
-    scraped_data = []
 
-    session = requests.Session()
-    session.headers.update(
-        {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/115.0.0.0 Safari/537.36"
-        }
-    )
+    def __init__(self, max_history=50):
+        self.jobs = OrderedDict()
+        self.current = None
+        self.max_history = max_history
+        self.lock = threading.Lock()
 
-    print("DEBUG: inizio scraping pagine lista...")
-    # Ciclo sulle pagine di lista (6 pagine)
-    for page in range(1, 7):
-        msg = f"Caricamento pagina {page}/6..."
-        socketio.emit("log", {"message": msg})
-        print(f"DEBUG: {msg}")
+    def submit(self, incremental=False):
+        """Restituisce (job, creato): creato=False se ci si è agganciati."""
+        with self.lock:
+            if self.current and self.current.active:
+                return self.current, False
+            job = ScrapeJob(incremental)
+            if not event_store.acquire_lock("scrape", job.id, SCRAPE_LOCK_TTL):
+                # Scraping in corso in un altro worker
+                owner = event_store.lock_owner("scrape")
+                other = self.get(owner) if owner else None
+                if other is None:
+                    # Lock appena preso, stato non ancora salvato
+                    other = ScrapeJob.from_dict({"job_id": owner or "", "status": "queued"})
+                return other, False
+            event_store.save_job(job.to_dict())
+            event_store.prune_jobs(self.max_history)
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.max_history:
+                self.jobs.popitem(last=False)
+            self.current = job
+        socketio.start_background_task(self._run, job)
+        return job, True
+
+    def get(self, job_id):
+        """Job di questo worker oppure, se di un altro, letto dall'archivio."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        data = event_store.load_job(job_id)
+        if data is None:
+            return None
+        job = ScrapeJob.from_dict(data)
+        if job.active and event_store.lock_owner("scrape") != job.id:
+            # Il worker che lo eseguiva è terminato senza chiuderlo
+            job.status = "error"
+            job.error = "Job interrotto: il worker che lo eseguiva non risponde"
+            job.finished.set()
+        return job
 
+    def wait(self, job):
+        """Attende la fine di un job (anche di un altro worker) e lo restituisce."""
+        if job.id in self.jobs:
+            job.finished.wait()
+            return job
+        while True:
+            current = self.get(job.id)
+            if current is None or not current.active:
+                return current or job
+            time.sleep(PROGRESS_INTERVAL)
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+        event_store.save_job(job.to_dict())
+        socketio.start_background_task(self._flush_progress, job)
         try:
-            # Costruisci URL con parametro page
-            url = f"{SEARCH_URL}?page={page}"
-            resp = session.get(url, timeout=15)
-            resp.raise_for_status()
-            print(f"DEBUG: URL chiamato: {resp.url}")
+            job.count = scrape_events(incremental=job.incremental, job=job)
+            job.status = "done"
+            job.set_progress("done", job.count, job.count)
         except Exception as e:
-            err = f"Errore caricamento pagina {page}: {e}"
-            socketio.emit("log", {"message": err})
-            print(f"DEBUG: {err}")
-            continue
+            print(f"DEBUG: errore job {job.id}: {e}")
+            job.log(f"Errore scraping: {e}")
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished_at = time.time()
+            job.flush()
+            event_store.release_lock("scrape", job.id)
+            if job.status == "done":
+                socketio.emit("scraping_done", {"job_id": job.id, "count": job.count}, to=job.id)
+            job.finished.set()
 
-        events = parse_list_page(resp.text)
-        print(f"DEBUG: pagina {page}, eventi trovati: {len(events)}")
-        scraped_data.extend(events)
-        time.sleep(1)
+    def _flush_progress(self, job):
+        # Un messaggio ogni PROGRESS_INTERVAL secondi al massimo, finché il
+        # job è in corso; l'ultimo lo invia _run. Intanto rinnova il lock.
+        while not job.finished.wait(PROGRESS_INTERVAL):
+            event_store.acquire_lock("scrape", job.id, SCRAPE_LOCK_TTL)
+            job.flush()
 
-    print(f"DEBUG: totale eventi raccolti dalla lista: {len(scraped_data)}")
-    socketio.emit("log", {"message": f"Totale eventi trovati: {len(scraped_data)}"})
 
-    # Ora visita ogni dettaglio per estrarre tutti i campi
-    for i, event in enumerate(scraped_data, start=1):
-        detail_url = event.get("detail_url", "")
-        if not detail_url:
-            continue
+job_runner = JobRunner()
 
-        msg = f"[{i}/{len(scraped_data)}] {event['title']}"
-        socketio.emit("log", {"message": msg})
-        print(f"DEBUG: {msg}")
 
-        try:
-            resp = session.get(detail_url, timeout=15)
-            resp.raise_for_status()
-            detail = parse_detail_page(resp.text, detail_url)
+def report(message):
+    """
+    Messaggio di log per i client: va nel job in corso (inviato accorpato
+    alla sua stanza) oppure, senza job, a tutti i client connessi.
+    """
+    job = job_runner.current
+    if job and job.active:
+        job.log(message)
+    else:
+        socketio.emit("log", {"message": message})
 
-            # Get external application form link
-            if detail["application_procedure_url"]:
-                print(f"    → Getting application form link...")
-                external_form_link = get_external_application_link(
-                    detail["application_procedure_url"]
-                )
-                detail["application_form_link"] = external_form_link
+
+# ========== SCRAPING PIANIFICATO ==========
+
+class IntervalSchedule:
+    """
+    Un run ogni `seconds` secondi, a scadenze allineate all'epoch: tutti i
+    worker calcolano le stesse.
+    """
+
+    UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("l'intervallo deve essere positivo")
+        self.seconds = seconds
+
+    def next_after(self, timestamp):
+        return (timestamp // self.seconds + 1) * self.seconds
+
+    def __str__(self):
+        return f"ogni {self.seconds:g} secondi"
+
+
+class CronSchedule:
+    """
+    Espressione cron a 5 campi (minuto, ora, giorno, mese, giorno della
+    settimana), in UTC: *, numeri, intervalli a-b, passi */n e a-b/n, liste
+    separate da virgole. La domenica è 0 (o 7). Come in cron, se sono
+    limitati sia il giorno del mese che quello della settimana, basta che
+    corrisponda uno dei due.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"espressione cron non valida (servono 5 campi): {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(x) for x in span.split("-", 1))
             else:
-                detail["application_form_link"] = ""
+                start = int(span)
+                # "5/15" = da 5 in poi, ogni 15
+                end = high if step else start
+            step = int(step) if step else 1
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"campo cron non valido: {part!r}")
+            values.update(range(start, end + 1, step))
+        return values
 
-            # Merge detail info into event
-            event.update(detail)
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
 
-        except Exception as e:
-            print(f"DEBUG: errore dettaglio {detail_url}: {e}")
-            # Set default empty values for all detail fields
-            event["participants_no"] = ""
-            event["participants_from"] = ""
-            event["recommended_for"] = ""
-            event["accessibility"] = ""
-            event["working_language"] = ""
-            event["organiser"] = ""
-            event["participation_fee"] = ""
-            event["accommodation_food"] = ""
-            event["travel_reimbursement"] = ""
-            event["infopack_downloads"] = ""
-            event["application_procedure_url"] = ""
-            event["application_form_link"] = ""
-
-        time.sleep(1)
+    def next_after(self, timestamp):
+        """Primo minuto dopo `timestamp` che corrisponde all'espressione."""
+        moment = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+        moment = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # Fino a 4 anni: basta anche per "0 0 29 2 *"
+        limit = moment + datetime.timedelta(days=4 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = moment.replace(day=1, hour=0, minute=0)
+                moment = (moment + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"l'espressione cron non corrisponde a nessuna data: {self.expression!r}")
 
-    # Salva automaticamente il CSV
-    save_csv_to_file()
+    def __str__(self):
+        return f"cron {self.expression!r} (UTC)"
 
-    socketio.emit("log", {"message": "Scraping completato!"})
-    socketio.emit("scraping_done", {"count": len(scraped_data)})
-    print("DEBUG: scraping completato!")
+
+def parse_schedule(text):
+    """SCRAPER_SCHEDULE -> IntervalSchedule, CronSchedule oppure None (vuoto)."""
+    if not text:
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smhd]?)", text.strip().lower())
+    if match:
+        schedule = IntervalSchedule(float(match.group(1)) * IntervalSchedule.UNITS[match.group(2)])
+    else:
+        schedule = CronSchedule(text)
+    # Un'espressione che non scatta mai è un errore di configurazione
+    schedule.next_after(time.time())
+    return schedule
+
+
+class Scheduler:
+    """
+    Avvia uno scraping in background a ogni scadenza di `schedule`.
+    Ogni worker ha il proprio scheduler, ma ogni scadenza viene eseguita una
+    volta sola: la esegue il primo worker che la segna nell'archivio
+    (EventStore.claim). Se uno scraping è già in corso, ci si aggancia a
+    quello come per /api/scrape.
+    """
+
+    def __init__(self, schedule, incremental=True):
+        self.schedule = schedule
+        self.incremental = incremental
+        self.next_run = None
+        self.started = False
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.schedule is None or self.started:
+                return
+            self.started = True
+        print(f"DEBUG: scraping pianificato {self.schedule}")
+        socketio.start_background_task(self._loop)
+
+    def stop(self):
+        self.stopped.set()
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            self.next_run = self.schedule.next_after(time.time())
+            if self.stopped.wait(max(self.next_run - time.time(), 0)):
+                break
+            try:
+                self.run_due(self.next_run)
+            except Exception as e:
+                print(f"DEBUG: errore scraping pianificato: {e}")
+
+    def run_due(self, due):
+        """Avvia il run della scadenza `due` (epoch), se nessun worker l'ha già fatto."""
+        slot = datetime.datetime.fromtimestamp(due, datetime.timezone.utc).isoformat()
+        if not event_store.claim("schedule", slot):
+            return None
+        job, created = job_runner.submit(incremental=self.incremental)
+        print(
+            f"DEBUG: scraping pianificato delle {slot}: "
+            f"{'avviato' if created else 'già in corso'} job {job.id}"
+        )
+        return job
+
+
+scheduler = Scheduler(parse_schedule(SCHEDULE), SCHEDULE_INCREMENTAL)
 
 
 # ========== ROUTES ==========
 
+@app.before_request
+def load_snapshot():
+    # Dopo un riavvio con archivio vuoto i dati tornano dall'ultimo snapshot,
+    # alla prima richiesta: /download_csv funziona senza un nuovo scraping
+    snapshots.ensure_loaded()
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
 @socketio.on("start_scraping")
-def handle_start_scraping():
-    emit("log", {"message": "Avvio scraping..."})
-    scrape_events()
+def handle_start_scraping(data=None):
+    job, created = job_runner.submit(incremental=bool((data or {}).get("incremental")))
+    # Chi avvia (o si aggancia a) un job ne riceve gli aggiornamenti
+    join_room(job.id)
+    if created:
+        emit("log", {"message": "Avvio scraping..."})
+    else:
+        emit("log", {"message": "Scraping già in corso, in attesa del risultato..."})
+    emit("job", job.to_dict())
+
+
+@socketio.on("subscribe")
+def handle_subscribe(data=None):
+    """Iscrive il client agli aggiornamenti di un job ({"job_id": ...})."""
+    job = job_runner.get((data or {}).get("job_id", ""))
+    if job is None:
+        emit("log", {"message": "Job non trovato"})
+        return
+    join_room(job.id)
+    emit("job", job.to_dict())
+
+
+@socketio.on("unsubscribe")
+def handle_unsubscribe(data=None):
+    job_id = (data or {}).get("job_id")
+    if job_id:
+        leave_room(job_id)
 
 
 @app.route("/download_csv")
 def download_csv():
-    if not scraped_data:
+    """
+    Scarica i risultati in streaming, una riga alla volta.
+    ?format=csv (default), ndjson oppure json; compressi con gzip se il
+    client lo accetta (Accept-Encoding).
+    """
+    if not event_store.count():
         return "Nessun dato disponibile", 400
 
-    # Crea CSV in memoria (testo)
-    text_buffer = StringIO()
-    fieldnames = [
-        "title",
-        "type",
-        "dates",
-        "location",
-        "application_deadline",
-        "participants_no",
-        "participants_from",
-        "recommended_for",
-        "accessibility",
-        "working_language",
-        "organiser",
-        "participation_fee",
-        "accommodation_food",
-        "travel_reimbursement",
-        "infopack_downloads",
-        "application_procedure_url",
-        "application_form_link",
-        "detail_url",
-    ]
-    writer = csv.DictWriter(text_buffer, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in scraped_data:
-        writer.writerow(row)
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return f"Formato non supportato: {fmt}", 400
+    serializer, content_type, extension = EXPORT_FORMATS[fmt]
 
-    # Converte in bytes per send_file
-    text_value = text_buffer.getvalue()
-    bytes_buffer = BytesIO(text_value.encode("utf-8"))
-    bytes_buffer.seek(0)
+    # Lettura dall'archivio condiviso: funziona da qualunque worker
+    rows = event_store.iter_events()
+    chunks = _batched(serializer(rows))
+    headers = {
+        "Content-Disposition": f"attachment; filename=salto_events_complete.{extension}",
+        "Vary": "Accept-Encoding",
+    }
+    if request.accept_encodings.best_match(["gzip"]) == "gzip":
+        chunks = _gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    else:
+        chunks = (chunk.encode("utf-8") for chunk in chunks)
 
-    return send_file(
-        bytes_buffer,
-        mimetype="text/csv; charset=utf-8",
-        as_attachment=True,
-        download_name="salto_events_complete.csv",
-    )
+    return Response(stream_with_context(chunks), content_type=content_type, headers=headers)
 
 
 # ========== ENDPOINT REST PER MAKE.COM ==========
@@ -594,7 +4253,22 @@ def api_scrape():
     Esempio di chiamata:
     POST https://TUO-PROGETTO.onrender.com/api/scrape
 
+    Con ?incremental=1 scarica solo i dettagli degli eventi nuovi o
+    modificati rispetto all'esecuzione precedente.
+
+    Lo scraping parte in background e la risposta arriva subito (202);
+    lo stato si legge da /api/jobs/<job_id>. Se uno scraping è già in
+    corso, la richiesta si aggancia a quello ("attached": true).
+
     Risposta JSON:
+    {
+        "status": "queued",
+        "job_id": "3f2c...",
+        "status_url": "/api/jobs/3f2c...",
+        "attached": false
+    }
+
+    Con ?wait=1 aspetta la fine del job e risponde come prima:
     {
         "status": "ok",
         "count": 60,
@@ -602,14 +4276,246 @@ def api_scrape():
     }
     """
     print("DEBUG: /api/scrape chiamato")
-    scrape_events()
+    incremental = _flag(request.args.get("incremental"))
+    job, created = job_runner.submit(incremental=incremental)
+
+    if _flag(request.args.get("wait")):
+        job = job_runner.wait(job)
+        if job.status == "error":
+            return jsonify({"status": "error", "job_id": job.id, "message": job.error}), 500
+        return jsonify({
+            "status": "ok",
+            "job_id": job.id,
+            "count": job.count,
+            "csv_path": CSV_PATH,
+            "message": "Scraping completato. CSV salvato."
+        })
 
     return jsonify({
-        "status": "ok",
-        "count": len(scraped_data),
-        "csv_path": f"{OUTPUT_DIR}/salto_events_complete.csv",
-        "message": "Scraping completato. CSV salvato."
+        "status": job.status,
+        "job_id": job.id,
+        "status_url": url_for("api_job", job_id=job.id),
+        "attached": not created,
+    }), 202
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    """Stato e avanzamento di un job di scraping."""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"status": "not_found", "job_id": job_id}), 404
+    return jsonify(job.to_dict())
+
+
+# Ordinamenti ammessi per /api/events (colonne indicizzate)
+EVENTS_SORTS = {
+    "position": "position",
+    "deadline": "deadline",
+    "start_date": "sort_key",
+    "type": "type",
+    "title": "title",
+}
+EVENTS_MAX_LIMIT = 500
+
+
+@app.route("/api/events")
+def api_events():
+    """
+    Eventi filtrati e paginati, letti dall'archivio SQLite.
+
+    Filtri (tutti opzionali):
+    - type: tipo esatto (ripetibile, es. ?type=Training Course&type=Seminar)
+    - working_language: una delle lingue di working_language (es. English
+      per "English, French"), senza distinzione tra maiuscole e minuscole
+    - location: una delle voci di location separate da virgole (città o
+      paese, es. Spain per "Zaragoza, Spain"), come working_language
+    - q: testo contenuto nel titolo. È un LIKE '%...%': non usa indici e
+      scorre tutti gli eventi (poche centinaia per il calendario SALTO)
+    - deadline_after / deadline_before: date ISO (AAAA-MM-GG), incluse
+    - deadline_within_days: scadenza tra oggi e oggi + N giorni
+
+    Ordinamento: ?sort=position (default), deadline, start_date, type,
+    title; con "-" davanti è decrescente. Paginazione: ?limit=50 e
+    ?cursor=<next_cursor>.
+    La risposta ha un ETag: con If-None-Match si ottiene 304 finché i dati
+    (e, con deadline_within_days, la data di oggi) non cambiano.
+    """
+    key = event_store.version() + "?" + request.query_string.decode("latin-1")
+    if request.args.get("deadline_within_days"):
+        # Finestra relativa: lo stesso URL dà risultati diversi ogni giorno
+        key += "@" + _today().isoformat()
+    etag = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    sort = request.args.get("sort", "position")
+    descending = sort.startswith("-")
+    sort_column = EVENTS_SORTS.get(sort.lstrip("-"))
+    if sort_column is None:
+        return jsonify({"error": f"sort non valido: {sort}"}), 400
+
+    try:
+        limit = min(max(int(request.args.get("limit", "50")), 1), EVENTS_MAX_LIMIT)
+        where, params = _events_filters(request.args)
+        after = _decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = event_store.query(where, params, sort_column, descending, limit + 1, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor([last[sort_column], last["detail_url"]])
+    for row in rows:
+        row.pop("position", None)
+
+    response = jsonify({"events": rows, "count": len(rows), "next_cursor": next_cursor})
+    response.set_etag(etag)
+    return response
+
+
+def _events_filters(args):
+    """Converte i parametri di /api/events in condizioni SQL."""
+    where = []
+    params = []
+
+    types = args.getlist("type")
+    if types:
+        where.append(f"type IN ({', '.join('?' for _ in types)})")
+        params.extend(types)
+    for field in EventStore.TERM_FIELDS:
+        value = args.get(field)
+        if value:
+            # Voce esatta, con l'indice di event_terms
+            where.append(
+                "detail_url IN (SELECT detail_url FROM event_terms WHERE field = ? AND term = ?)"
+            )
+            params.extend([field, EventStore.normalize_term(value)])
+    if args.get("q"):
+        where.append("title LIKE ? ESCAPE '\\'")
+        params.append("%" + re.sub(r"([%_\\])", r"\\\1", args["q"]) + "%")
+
+    deadline_after = _iso_date_arg(args, "deadline_after")
+    deadline_before = _iso_date_arg(args, "deadline_before")
+    if args.get("deadline_within_days"):
+        days = int(args["deadline_within_days"])
+        today = _today()
+        deadline_after = max(deadline_after or "", today.isoformat())
+        limit_day = (today + datetime.timedelta(days=days)).isoformat()
+        deadline_before = min(deadline_before, limit_day) if deadline_before else limit_day
+    if deadline_after:
+        where.append("deadline >= ?")
+        params.append(deadline_after)
+    if deadline_before:
+        where.append("deadline != '' AND deadline <= ?")
+        params.append(deadline_before)
+    return where, params
+
+
+def _today():
+    return datetime.date.today()
+
+
+def _iso_date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} deve essere una data AAAA-MM-GG")
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("cursor non valido")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("cursor non valido")
+    return values
+
+
+@app.route("/api/changes")
+def api_changes():
+    """
+    Differenze tra run, chiave detail_url: eventi aggiunti, rimossi e
+    modificati (con i campi cambiati, vecchio e nuovo valore).
+    ?since=<run_id> accorpa tutti i run successivi a quello indicato (il
+    "latest" della risposta precedente); senza since, solo l'ultimo run.
+    """
+    since = request.args.get("since")
+    if since:
+        seq = event_store.run_seq(since)
+        if seq is None:
+            return jsonify({"error": f"run sconosciuto o non più disponibile: {since}"}), 404
+    else:
+        runs = event_store.runs()
+        seq = runs[-1]["seq"] - 1 if runs else 0
+
+    etag = hashlib.sha1(f"{event_store.version()}:{seq}".encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    runs = event_store.runs(seq)
+    changes = merge_changes(event_store.iter_changes(seq))
+    response = jsonify({
+        "since": since,
+        "latest": runs[-1]["run_id"] if runs else since,
+        "runs": runs,
+        **changes,
     })
+    response.set_etag(etag)
+    return response
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Metriche della pipeline in formato Prometheus."""
+    text = metrics.prometheus()
+    text += (
+        "# HELP salto_events_stored Eventi nell'archivio.\n"
+        "# TYPE salto_events_stored gauge\n"
+        f"salto_events_stored {event_store.count()}\n"
+    )
+    return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/api/runs/last")
+def api_last_run():
+    """Riepilogo JSON dell'ultimo run (tempi per fase, richieste, byte, retry)."""
+    if not os.path.exists(LAST_RUN_PATH):
+        return jsonify({"status": "not_found"}), 404
+    with open(LAST_RUN_PATH, encoding="utf-8") as f:
+        return jsonify(json.load(f))
+
+
+def _flag(value):
+    return (value or "0").lower() in ("1", "true", "yes")
+
+
+def _serving_process():
+    # Lo scheduler non parte nei processi del ParserPool né nel processo
+    # padre del reloader di debug (che serve solo a riavviare il figlio)
+    if multiprocessing.parent_process() is not None:
+        return False
+    return __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+
+
+if _serving_process():
+    scheduler.start()
 
 
 if __name__ == "__main__":
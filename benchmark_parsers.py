@@ -0,0 +1,199 @@
+"""
+Benchmark e regressione dei parser HTML (parse_list_page / parse_detail_page).
+
+Usa solo le pagine salvate nel repository, senza rete:
+- pagina lista: salto_page1.html
+- pagine dettaglio: fixtures/detail/*.html
+
+Per ogni backend disponibile (bs4, lxml) misura pagine/secondo, latenza
+media e p95 e picco di memoria, poi confronta l'output con i JSON "golden"
+in fixtures/golden/. Esce con codice 1 se un output differisce.
+
+Esempi:
+    python benchmark_parsers.py
+    python benchmark_parsers.py --repeat 50 --backend lxml
+    python benchmark_parsers.py --update-golden
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import app
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(ROOT, "fixtures")
+GOLDEN_DIR = os.path.join(FIXTURES_DIR, "golden")
+
+# URL fittizio passato a parse_detail_page (non influisce sull'output)
+DETAIL_URL = app.BASE_URL + "/tools/european-training-calendar/training/fixture/"
+
+
+def load_corpus():
+    """Restituisce la lista di (tipo, nome, html) delle pagine salvate."""
+    corpus = []
+    path = os.path.join(ROOT, "salto_page1.html")
+    corpus.append(("list", os.path.basename(path), _read(path)))
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "detail", "*.html"))):
+        corpus.append(("detail", os.path.basename(path), _read(path)))
+    return corpus
+
+
+def _read(path):
+    # newline="" mantiene i \r\n come arrivano dal server
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def available_backends():
+    backends = ["bs4"]
+    if app.etree is not None:
+        backends.append("lxml")
+    return backends
+
+
+def parse(backend, kind, html):
+    if kind == "list":
+        if backend == "lxml":
+            return app._parse_list_page_lxml(html)
+        return app._parse_list_page_bs4(html)
+    if backend == "lxml":
+        return app._parse_detail_page_lxml(html, DETAIL_URL)
+    return app._parse_detail_page_bs4(html, DETAIL_URL)
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, os.path.splitext(name)[0] + ".json")
+
+
+def check_golden(backend, corpus):
+    """Confronta l'output con i golden; restituisce la lista delle differenze."""
+    failures = []
+    for kind, name, html in corpus:
+        path = golden_path(name)
+        if not os.path.exists(path):
+            failures.append(f"{backend}: {name}: golden mancante ({path})")
+            continue
+        with open(path, encoding="utf-8") as f:
+            expected = json.load(f)
+        got = parse(backend, kind, html)
+        if got != expected:
+            failures.append(f"{backend}: {name}: output diverso dal golden")
+            for line in _diff(expected, got):
+                failures.append(f"    {line}")
+    return failures
+
+
+def _diff(expected, got):
+    if isinstance(expected, dict) and isinstance(got, dict):
+        for key in sorted(set(expected) | set(got)):
+            if expected.get(key) != got.get(key):
+                yield f"{key}: atteso {expected.get(key)!r}, ottenuto {got.get(key)!r}"
+    elif isinstance(expected, list) and isinstance(got, list):
+        if len(expected) != len(got):
+            yield f"eventi: attesi {len(expected)}, ottenuti {len(got)}"
+        for i, (e, g) in enumerate(zip(expected, got)):
+            for line in _diff(e, g):
+                yield f"[{i}] {line}"
+    else:
+        yield f"atteso {expected!r}, ottenuto {got!r}"
+
+
+def update_golden(corpus):
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for kind, name, html in corpus:
+        # I golden si generano sempre dal backend di riferimento (bs4)
+        result = parse("bs4", kind, html)
+        with open(golden_path(name), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"golden aggiornato: {golden_path(name)}")
+
+
+def benchmark(backend, corpus, repeat):
+    """Restituisce le statistiche di velocità e memoria per un backend."""
+    # Un giro di riscaldamento fuori misura
+    for kind, _, html in corpus:
+        parse(backend, kind, html)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, _, html in corpus:
+            t0 = time.perf_counter()
+            parse(backend, kind, html)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Memoria misurata a parte: tracemalloc rallenta il parsing
+    tracemalloc.start()
+    for kind, _, html in corpus:
+        parse(backend, kind, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return {
+        "pages": len(latencies),
+        "pages_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": p95 * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="passate sul corpus per backend (default: 20)")
+    parser.add_argument("--backend", choices=["all", "bs4", "lxml"], default="all")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="rigenera fixtures/golden/ dal backend bs4")
+    parser.add_argument("--json", action="store_true",
+                        help="stampa i risultati in JSON")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus()
+    if args.update_golden:
+        update_golden(corpus)
+        return 0
+
+    backends = available_backends()
+    if args.backend != "all":
+        if args.backend not in backends:
+            print(f"backend {args.backend} non disponibile (lxml non installato?)")
+            return 2
+        backends = [args.backend]
+
+    failures = []
+    results = {}
+    for backend in backends:
+        failures += check_golden(backend, corpus)
+        results[backend] = benchmark(backend, corpus, args.repeat)
+
+    if args.json:
+        print(json.dumps({"results": results, "failures": failures}, indent=2))
+    else:
+        print(f"Corpus: {len(corpus)} pagine, {args.repeat} passate")
+        print(f"{'backend':<8} {'pagine/s':>10} {'media ms':>10} {'p95 ms':>10} {'picco KiB':>11}")
+        for backend, r in results.items():
+            print(
+                f"{backend:<8} {r['pages_per_sec']:>10.1f} {r['mean_ms']:>10.2f} "
+                f"{r['p95_ms']:>10.2f} {r['peak_kib']:>11.0f}"
+            )
+        if failures:
+            print("\nDifferenze rispetto ai golden:")
+            print("\n".join(failures))
+        else:
+            print("\nOutput identico ai golden per tutti i backend.")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
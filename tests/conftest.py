@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Archivio SQLite vuoto al posto di quello in output/."""
+    event_store = app_module.EventStore(str(tmp_path / "events.db"), app_module.CSV_FIELDNAMES)
+    monkeypatch.setattr(app_module, "event_store", event_store)
+    monkeypatch.setattr(app_module.snapshots, "loaded", True)
+    return event_store
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
@@ -0,0 +1,92 @@
+from werkzeug.datastructures import MultiDict
+
+import app
+
+
+def _event(n, start_date=""):
+    return {
+        "title": f"Evento {n}",
+        "type": "Training Course",
+        "detail_url": f"https://example.org/training/{n}/",
+        "start_date": start_date,
+        "sort_key": app.date_sort_key(start_date),
+    }
+
+
+def _walk(client, query):
+    urls = []
+    cursor = None
+    while True:
+        url = f"/api/events?{query}" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        urls += [row["detail_url"] for row in data["events"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return urls
+
+
+def test_start_date_pagination_includes_undated_events(store, client):
+    events = [
+        _event(1, "2026-03-01"),
+        _event(2),
+        _event(3, "2026-01-15"),
+        _event(4),
+        _event(5, "2026-02-10"),
+        _event(6),
+    ]
+    store.replace_all(events)
+
+    urls = _walk(client, "sort=start_date&limit=2")
+    dated = [_event(n)["detail_url"] for n in (3, 5, 1)]
+    undated = sorted(_event(n)["detail_url"] for n in (2, 4, 6))
+    assert urls == dated + undated
+
+    urls = _walk(client, "sort=-start_date&limit=2")
+    assert urls == list(reversed(dated + undated))
+
+
+def test_relative_deadline_etag_changes_with_the_date(store, client, monkeypatch):
+    events = [_event(1), _event(2)]
+    events[0]["deadline"] = "2026-10-20"
+    events[1]["deadline"] = "2026-10-30"
+    store.replace_all(events)
+    url = "/api/events?deadline_within_days=5"
+
+    monkeypatch.setattr(app, "_today", lambda: app.datetime.date(2026, 10, 17))
+    first = client.get(url)
+    assert [row["title"] for row in first.get_json()["events"]] == ["Evento 1"]
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    monkeypatch.setattr(app, "_today", lambda: app.datetime.date(2026, 10, 28))
+    later = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert later.status_code == 200
+    assert [row["title"] for row in later.get_json()["events"]] == ["Evento 2"]
+
+
+def test_language_and_location_filters_use_the_terms_index(store, client):
+    events = [
+        dict(_event(1), working_language="English, French", location="Zaragoza, Spain"),
+        dict(_event(2), working_language="English", location="Pau, France"),
+        dict(_event(3), working_language="Spanish and English", location="Online, Spain"),
+    ]
+    store.replace_all(events)
+
+    def urls(query):
+        return sorted(row["detail_url"][-2] for row in
+                      client.get(f"/api/events?{query}").get_json()["events"])
+
+    assert urls("working_language=english") == ["1", "2", "3"]
+    assert urls("working_language=French") == ["1"]
+    assert urls("location=Spain") == ["1", "3"]
+    assert urls("location=Spain&working_language=french") == ["1"]
+
+    where, params = app._events_filters(MultiDict(
+        {"working_language": "French"}
+    ))
+    plan = " ".join(
+        row[-1] for row in store._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT detail_url FROM events WHERE " + " AND ".join(where),
+            params,
+        )
+    )
+    assert "USING PRIMARY KEY" in plan or "USING COVERING INDEX" in plan
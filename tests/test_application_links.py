@@ -0,0 +1,51 @@
+import pytest
+
+import app
+
+
+def test_each_procedure_url_is_resolved_once_per_run(store, monkeypatch):
+    calls = []
+
+    def fetch(url, session):
+        calls.append(url)
+        if url.endswith("/broken/"):
+            raise app.requests.HTTPError("503 Server Error")
+        return "https://forms.gle/abc"
+
+    monkeypatch.setattr(app, "_fetch_external_application_link", fetch)
+    resolver = app.ApplicationLinkResolver(store, ttl=3600)
+    resolver.reset_stats()
+
+    for _ in range(3):
+        with pytest.raises(app.requests.HTTPError):
+            resolver.resolve("https://example.org/broken/", session=object())
+    assert calls == ["https://example.org/broken/"]
+    assert resolver.stats()["deduplicated"] == 2
+
+    # Run successivo: l'errore non è memorizzato, si riprova
+    resolver.reset_stats()
+    with pytest.raises(app.requests.HTTPError):
+        resolver.resolve("https://example.org/broken/", session=object())
+    assert len(calls) == 2
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise app.requests.HTTPError(f"{self.status_code} Error")
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_permanent_client_error_means_no_link(monkeypatch, status):
+    monkeypatch.setattr(app, "throttled_get", lambda session, url, **kw: _Response(status))
+    assert app._fetch_external_application_link("https://example.org/gone/", object()) == ""
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_transient_error_is_raised(monkeypatch, status):
+    monkeypatch.setattr(app, "throttled_get", lambda session, url, **kw: _Response(status))
+    with pytest.raises(app.requests.HTTPError):
+        app._fetch_external_application_link("https://example.org/busy/", object())
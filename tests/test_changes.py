@@ -0,0 +1,57 @@
+import json
+
+import app
+
+
+def _event(n, organiser="Verein"):
+    return {
+        "title": f"Evento {n}",
+        "detail_url": f"https://example.org/training/{n}/",
+        "organiser": organiser,
+    }
+
+
+def test_changes_are_streamed_to_the_store(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CHANGES_DIR", str(tmp_path / "changes"))
+    previous = {e["detail_url"]: e for e in (_event(1), _event(2))}
+    tracker = app.ChangeTracker(previous, store, "run-2", batch_size=1)
+
+    tracker.add(_event(1, organiser="Altro Verein"))
+    tracker.add(_event(3))
+    for prev in list(tracker.missing()):
+        tracker.remove(prev)
+
+    # In memoria solo i conteggi: le righe sono già nell'archivio
+    assert tracker.batch == []
+    assert tracker.counts == {"added": 1, "removed": 1, "modified": 1}
+
+    store.commit_staged("run-2", tracker.counts)
+    path = app.write_changes_file("run-2", "run-1", store)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["previous_run"] == "run-1"
+    assert [c["detail_url"] for c in data["added"]] == ["https://example.org/training/3/"]
+    assert [c["detail_url"] for c in data["removed"]] == ["https://example.org/training/2/"]
+    assert data["modified"][0]["fields"] == {
+        "organiser": {"old": "Verein", "new": "Altro Verein"}
+    }
+    assert store.runs()[0]["modified"] == 1
+
+
+def test_removed_then_added_compares_only_event_fields():
+    old = dict(_event(1), detail_digest="aaa", infopack_files="x  a.pdf")
+    new = dict(_event(1, organiser="Altro Verein"), detail_digest="bbb", infopack_files="")
+    merged = app.merge_changes([
+        {"detail_url": old["detail_url"], "kind": "removed", "fields": {}, "event": old},
+        {"detail_url": new["detail_url"], "kind": "added", "fields": {}, "event": new},
+    ])
+    assert merged["modified"][0]["fields"] == {
+        "organiser": {"old": "Verein", "new": "Altro Verein"}
+    }
+
+
+def test_fetch_error_alone_is_not_a_change(store):
+    previous = {e["detail_url"]: e for e in (_event(1),)}
+    tracker = app.ChangeTracker(previous, store, "run-2")
+    tracker.add(dict(_event(1), fetch_error="503 Server Error"))
+    assert tracker.counts == {"added": 0, "removed": 0, "modified": 0}
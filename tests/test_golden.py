@@ -0,0 +1,10 @@
+import pytest
+
+import benchmark_parsers
+
+
+@pytest.mark.parametrize("backend", benchmark_parsers.available_backends())
+def test_parsers_match_golden(backend):
+    corpus = benchmark_parsers.load_corpus()
+    assert corpus
+    assert benchmark_parsers.check_golden(backend, corpus) == []
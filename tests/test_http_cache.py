@@ -0,0 +1,36 @@
+import app
+
+
+class _Session:
+    """Risponde 200 con ETag la prima volta, poi 304."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        resp = app.requests.Response()
+        resp.url = url
+        if self.calls == 1:
+            resp.status_code = 200
+            resp._content = b"<html></html>"
+            resp.headers["ETag"] = '"v1"'
+        else:
+            resp.status_code = 304
+            resp._content = b""
+        return resp
+
+
+def test_parsed_result_is_dropped_after_a_parser_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "HTTP_CACHE_ENABLED", True)
+    cache = app.HttpCache(str(tmp_path), 10 ** 6, 3600)
+    session = app.CachedSession(_Session(), cache)
+    url = "https://example.org/browse/"
+
+    session.get(url)
+    cache.set_parsed(url, [{"title": "Evento"}])
+    assert session.get(url).parsed == [{"title": "Evento"}]
+
+    monkeypatch.setattr(app, "PARSED_CACHE_VERSION", "99.99")
+    resp = session.get(url)
+    assert resp.not_modified and resp.parsed is None
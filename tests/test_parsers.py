@@ -0,0 +1,38 @@
+import os
+import re
+from html import unescape
+
+import app
+
+MALFORMED_DETAIL = (
+    "<html><body><h3>Training overview</h3>"
+    "<p>for<div>24 participants</div>from<br>Italy</p>"
+    "</body></html>"
+)
+
+
+def test_default_backend_is_bs4():
+    assert not app._use_lxml()
+    assert app.parse_detail_page(MALFORMED_DETAIL, "") == app._parse_detail_page_bs4(
+        MALFORMED_DETAIL, ""
+    )
+    assert app.parse_detail_page(MALFORMED_DETAIL, "")["participants_from"] == "Italy"
+
+
+def test_list_page_urls_follow_the_pager():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "salto_page1.html"), encoding="utf-8") as f:
+        html = f.read()
+    pager = re.search(r'<ol class="pagination[^"]*">(.*?)</ol>', html, re.S).group(1)
+    hrefs = [unescape(h) for h in re.findall(r'href="\./(\?[^"]*)"', pager)]
+
+    query = app.parse_list_pager(html)
+    urls = [app.list_page_url(page, 10, query) for page in range(2, 7)]
+    assert urls == [app.SEARCH_URL + href for href in dict.fromkeys(hrefs)]
+
+
+def test_digest_keeps_line_breaks_seen_by_the_parser():
+    one_line = b"<p>for 24 participants</p>"
+    two_lines = b"<p>for\n24 participants</p>"
+    assert app.content_digest(one_line) != app.content_digest(two_lines)
+    assert app.content_digest(two_lines) == app.content_digest(b"<p>for  \r\n\n\t24   participants</p>")
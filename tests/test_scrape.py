@@ -0,0 +1,56 @@
+import pytest
+
+import app
+
+
+def _event(n):
+    return {"title": f"Evento {n}", "detail_url": f"https://example.org/training/{n}/"}
+
+
+@pytest.fixture
+def run(store, tmp_path, monkeypatch):
+    """_run_scrape senza rete, con le pagine lista date e i file in tmp_path."""
+    for name in ("OUTPUT_DIR", "CHANGES_DIR"):
+        monkeypatch.setattr(app, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(app, "CSV_PATH", str(tmp_path / "complete.csv"))
+    monkeypatch.setattr(app, "PARTIAL_CSV_PATH", str(tmp_path / "partial.csv"))
+    monkeypatch.setattr(app, "INFOPACK_MIRROR", False)
+    monkeypatch.setattr(app, "build_session", lambda: None)
+    monkeypatch.setattr(app.http_cache, "reload", lambda: None)
+    saved = []
+    monkeypatch.setattr(app.snapshots, "save", saved.append)
+
+    def enrich(session, events, previous, incremental, counts, job=None):
+        for row in events:
+            yield app.Event.from_row(row)
+
+    monkeypatch.setattr(app, "enrich_events", enrich)
+
+    def scrape(listed, list_errors):
+        def iter_list_events(session, counts, job=None):
+            counts["list_errors"] += list_errors
+            counts["listed"] += len(listed)
+            yield from listed
+
+        monkeypatch.setattr(app, "iter_list_events", iter_list_events)
+        return app._run_scrape(False, None, app.uuid.uuid4().hex)
+
+    scrape.snapshots = saved
+    return scrape
+
+
+def test_full_run_without_list_pages_keeps_the_store(store, run):
+    store.replace_all([_event(1), _event(2)])
+    with pytest.raises(RuntimeError):
+        run([], list_errors=1)
+    assert store.count() == 2
+    assert store.runs() == []
+    assert run.snapshots == []
+
+
+def test_full_run_with_partial_listing_keeps_missing_events(store, run):
+    store.replace_all([_event(1), _event(2)])
+    run([_event(1)], list_errors=1)
+    assert store.count() == 2
+    assert store.runs()[0]["removed"] == 0
+    assert run.snapshots == []